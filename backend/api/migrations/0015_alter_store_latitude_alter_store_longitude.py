@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_productscoresnapshot_productuserrating_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='store',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
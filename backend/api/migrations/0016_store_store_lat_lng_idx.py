@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-16 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_alter_store_latitude_alter_store_longitude'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['latitude', 'longitude'], name='store_lat_lng_idx'),
+        ),
+    ]
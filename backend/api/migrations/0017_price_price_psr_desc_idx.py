@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-16 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_store_store_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['product', 'store', '-recorded_at'], name='price_psr_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-16 11:10
+
+from django.db import migrations, models
+
+
+def populate_is_butter(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    Product.objects.filter(name__icontains='butter').update(is_butter=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_price_price_psr_desc_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_butter',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text="Set on save when the name mentions butter"),
+        ),
+        migrations.RunPython(populate_is_butter, migrations.RunPython.noop),
+    ]
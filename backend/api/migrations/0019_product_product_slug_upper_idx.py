@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-16 11:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_product_is_butter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Upper('slug'), name='product_slug_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-16 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_product_product_slug_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['store', '-recorded_at'], name='price_store_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-16 12:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def populate_price_per_100g_cents(apps, schema_editor):
+    Price = apps.get_model('api', 'Price')
+    batch = []
+    rows = Price.objects.filter(product__weight_grams__gt=0).select_related('product').only(
+        'id', 'price', 'product__weight_grams'
+    )
+    for price in rows.iterator(chunk_size=2000):
+        # Same rounding as Price.cents_per_100g
+        price.price_per_100g_cents = int(round(
+            (Decimal(price.price) * 100 / Decimal(price.product.weight_grams)) * 100
+        ))
+        batch.append(price)
+        if len(batch) >= 2000:
+            Price.objects.bulk_update(batch, ['price_per_100g_cents'])
+            batch = []
+    if batch:
+        Price.objects.bulk_update(batch, ['price_per_100g_cents'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_price_price_store_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='price',
+            name='price_per_100g_cents',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, help_text='Unit price in cents per 100 g, set on save', null=True),
+        ),
+        migrations.RunPython(populate_price_per_100g_cents, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.db.models import Q, CheckConstraint
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -23,8 +24,8 @@ class Store(models.Model):
     location = models.CharField(max_length=200, blank=True)
     region = models.CharField(max_length=50, blank=True)
     city = models.CharField(max_length=80, db_index=True, blank=True)
-    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
-    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     address = models.CharField(max_length=300, blank=True)
     store_code = models.CharField(max_length=80, blank=True, db_index=True)
     is_active = models.BooleanField(default=True)
@@ -33,6 +34,9 @@ class Store(models.Model):
 
     class Meta:
         unique_together = ['name', 'chain', 'city']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='store_lat_lng_idx'),
+        ]
         constraints = [
             CheckConstraint(
                 check=Q(chain__in=['paknsave', 'woolworths', 'new_world']),
@@ -84,6 +88,8 @@ class Product(models.Model):
     image = models.ImageField(upload_to="products/", blank=True, null=True)  # Direct image field
     is_active = models.BooleanField(default=True)
     is_healthy_option = models.BooleanField(default=False)
+    is_butter = models.BooleanField(default=False, db_index=True, editable=False,
+        help_text="Set on save when the name mentions butter")
     serving_size_g = models.PositiveIntegerField(default=10,
         help_text="Default serving size (grams) for calorie equivalence")
     versatility_tags = models.JSONField(default=list, blank=True,
@@ -97,6 +103,10 @@ class Product(models.Model):
 
     class Meta:
         unique_together = ['name', 'brand', 'weight_grams']
+        indexes = [
+            # slug__iexact compiles to UPPER(slug) = UPPER(%s) on PostgreSQL
+            models.Index(Upper('slug'), name='product_slug_upper_idx'),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.name} ({self.weight_grams}g)"
@@ -112,6 +122,11 @@ class Product(models.Model):
                 suffix += 1
                 slug_candidate = f"{base}-{suffix}"
             self.slug = slug_candidate
+        # Denormalised so hot "butter only" filters hit an index instead of a name LIKE scan
+        self.is_butter = 'butter' in (self.name or '').lower()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'is_butter'}
         return super().save(*args, **kwargs)
 
     @property
@@ -126,6 +141,15 @@ class Product(models.Model):
         """Get the primary image, preferring STORE > GS1 > OFF > UPLOAD"""
         from django.db.models import Case, When, IntegerField
 
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('image_assets')
+        if prefetched is not None:
+            # Same ranking as the query below, over prefetch_related('image_assets')
+            priority = {'STORE': 0, 'GS1': 1, 'OFF': 2, 'UPLOAD': 3}
+            candidates = [a for a in prefetched if a.is_active and a.file.name is not None]
+            candidates.sort(key=lambda a: a.last_fetched_at.timestamp() if a.last_fetched_at else float('-inf'), reverse=True)
+            candidates.sort(key=lambda a: priority.get(a.source, 9))
+            return candidates[0] if candidates else None
+
         return (
             self.image_assets
             .filter(is_active=True, file__isnull=False)
@@ -150,19 +174,29 @@ class Product(models.Model):
     def get_user_rating_summary(self):
         from django.db.models import Avg, Count
 
-        stats = self.user_ratings.aggregate(
-            avg_overall=Avg('overall_score'),
-            avg_cost=Avg('cost_score'),
-            avg_texture=Avg('texture_score'),
-            avg_recipe=Avg('recipe_score'),
-            count=Count('id'),
-        ) if hasattr(self, 'user_ratings') else {
-            'avg_overall': None,
-            'avg_cost': None,
-            'avg_texture': None,
-            'avg_recipe': None,
-            'count': 0,
-        }
+        if hasattr(self, 'rating_count'):
+            # Annotated by the detail queryset; saves an aggregate query per product
+            stats = {
+                'avg_overall': self.rating_avg_overall,
+                'avg_cost': self.rating_avg_cost,
+                'avg_texture': self.rating_avg_texture,
+                'avg_recipe': self.rating_avg_recipe,
+                'count': self.rating_count,
+            }
+        else:
+            stats = self.user_ratings.aggregate(
+                avg_overall=Avg('overall_score'),
+                avg_cost=Avg('cost_score'),
+                avg_texture=Avg('texture_score'),
+                avg_recipe=Avg('recipe_score'),
+                count=Count('id'),
+            ) if hasattr(self, 'user_ratings') else {
+                'avg_overall': None,
+                'avg_cost': None,
+                'avg_texture': None,
+                'avg_recipe': None,
+                'count': 0,
+            }
 
         def _to_float(val):
             return round(float(val), 1) if val is not None else None
@@ -375,18 +409,35 @@ class Price(models.Model):
     special_end_date = models.DateField(null=True, blank=True)
     recorded_at = models.DateTimeField(auto_now_add=True)
     scraped_at = models.DateTimeField(auto_now_add=True)
+    price_per_100g_cents = models.IntegerField(null=True, blank=True, db_index=True, editable=False,
+                                               help_text="Unit price in cents per 100 g, set on save")
 
     class Meta:
         unique_together = ['store', 'product', 'recorded_at']
         ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['product', 'store', '-recorded_at'], name='price_psr_desc_idx'),
+            models.Index(fields=['store', '-recorded_at'], name='price_store_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.store} - {self.product} - ${self.price}"
 
+    @staticmethod
+    def cents_per_100g(price, weight_grams):
+        """Unit price in whole cents per 100 g, or None without a price or weight."""
+        if price is None or not weight_grams:
+            return None
+        return int(round((Decimal(price) * 100 / Decimal(weight_grams)) * 100))
+
     def save(self, *args, **kwargs):
         # Calculate price per kg
         if self.price and self.product.weight_grams:
             self.price_per_kg = (self.price / self.product.weight_grams) * 1000
+        self.price_per_100g_cents = self.cents_per_100g(self.price, self.product.weight_grams)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'price' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'price_per_100g_cents'}
         super().save(*args, **kwargs)
 
 
@@ -0,0 +1,36 @@
+"""
+JSON renderer backed by orjson.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; ORJSONRenderer falls back to DRF's encoder
+    orjson = None
+
+if orjson is not None:
+    # Datetimes are passed through so they keep DRF's format (millisecond precision, "Z")
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+else:
+    ORJSON_OPTIONS = 0
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that encodes with orjson.
+
+    Types orjson doesn't handle natively (Decimal, lazy strings, querysets,
+    passed-through datetimes) go through DRF's JSONEncoder, so the output
+    matches the stock renderer.
+    """
+
+    _fallback = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indented output (the browsable API, ?indent=) is rare; leave it to DRF
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._fallback.default, option=ORJSON_OPTIONS)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Store, Product, Price, PriceAlert, ImageAsset, NutritionProfile, EconomicIndicator, EmailSubscription, ScrapingLog, ListItem, PriceContribution, ProductScoreSnapshot, ProductUserRating
 import re
+from functools import lru_cache
 from django.utils.text import slugify as dj_slug
 
 
@@ -52,6 +53,12 @@ def absolutize(urlish, request):
     s = s if s.startswith("/") else f"/{s}"
     return request.build_absolute_uri(s)
 
+@lru_cache(maxsize=512)
+def brand_image_path(brand):
+    """Static fallback image path for a brand; slugify is the costly part and brands repeat."""
+    return f"/static/brands/{dj_slug(brand)}.png"
+
+
 def pick_image_url(p, request):
     
     image_field = getattr(p, "image", None)
@@ -63,17 +70,29 @@ def pick_image_url(p, request):
     
     brand = getattr(p, "brand_display_name", None)
     if request and brand:
-        return request.build_absolute_uri(f"/static/brands/{dj_slug(brand)}.png")
+        return request.build_absolute_uri(brand_image_path(brand))
     return None
 
 
 
 class StoreSerializer(serializers.ModelSerializer):
+    # Stored as floats for the distance maths; rendered as the 6dp decimal strings clients expect
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6, allow_null=True, required=False)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, allow_null=True, required=False)
+
     class Meta:
         model = Store
         fields = '__all__'
 
 
+class NearbyStoreSerializer(StoreSerializer):
+    """StoreSerializer plus the distance_m annotation from StoreViewSet.nearby, in km."""
+    distance = serializers.SerializerMethodField()
+
+    def get_distance(self, obj):
+        return round(obj.distance_m / 1000, 2)
+
+
 class DetailedImageAssetSerializer(serializers.ModelSerializer):
     """Detailed serializer for ImageAsset model"""
     file_url = serializers.SerializerMethodField()
@@ -106,6 +125,73 @@ class MinimalProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'brand', 'gtin', 'weight_grams', 'primary_image']
 
 
+def product_grams(obj):
+    g = first(
+        to_num(getattr(obj, "grams", None)),
+        to_num(getattr(obj, "size_g", None)),
+        to_num(getattr(obj, "size_grams", None)),
+        to_num(getattr(obj, "weight_g", None)),
+        to_num(getattr(obj, "weight_grams", None)),
+    )
+    if g:
+        return int(g)
+    # parse from text
+    return parse_grams_from_text(
+        getattr(obj, "size_text", None), 
+        obj.name, 
+        getattr(obj, "title", None)
+    )
+
+def product_slug(obj, grams=None):
+    if getattr(obj, 'slug', None):
+        return obj.slug
+    if grams is None:
+        grams = product_grams(obj)
+    brand_name = obj.brand_display_name
+    base = " ".join([
+        brand_name, 
+        obj.name or "", 
+        f"{grams}g" if grams else ""
+    ]).strip()
+    return dj_slug(base) or dj_slug(obj.name or "") or f"product-{obj.pk}"
+
+def product_image_url(obj, request):
+    url = pick_image_url(obj, request) if request else getattr(obj, "image_url", None)
+    if not url and obj.brand:
+        # optional brand fallback path (serve from /static/brands/<brand>.png if you have it)
+        return request.build_absolute_uri(brand_image_path(obj.brand_display_name)) if request else None
+    return url
+
+def product_price(obj, store_id=None):
+    prefetched = getattr(obj, "store_prices", None)
+    if prefetched is not None:
+        return float(prefetched[0].price) if prefetched else None
+    qs = Price.objects.filter(product=obj)
+    if store_id:
+        qs = qs.filter(store_id=store_id)
+    val = qs.order_by("-recorded_at").values_list("price", flat=True).first()
+    # if amount stored in cents, convert here instead:
+    return float(val) if val is not None else None
+
+def product_list_rows(products, request, store_id=None):
+    """Build ProductListSerializer-shaped dicts without per-row serializer setup."""
+    rows = []
+    for obj in products:
+        grams = product_grams(obj)
+        rows.append({
+            "id": obj.id,
+            "name": obj.name,
+            "brand": obj.brand,
+            "brand_display_name": obj.brand_display_name,
+            "grams": grams,
+            "slug": product_slug(obj, grams),
+            "image_url": product_image_url(obj, request),
+            "price": product_price(obj, store_id),
+            "name_with_brand": f"{obj.brand or ''} {obj.name}".strip(),
+        })
+    return rows
+
+
 class ProductListSerializer(serializers.ModelSerializer):
     grams = serializers.SerializerMethodField()
     slug = serializers.SerializerMethodField()
@@ -119,54 +205,20 @@ class ProductListSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "brand", "brand_display_name", "grams", "slug", "image_url", "price", "name_with_brand"]
 
     def get_grams(self, obj):
-        g = first(
-            to_num(getattr(obj, "grams", None)),
-            to_num(getattr(obj, "size_g", None)),
-            to_num(getattr(obj, "size_grams", None)),
-            to_num(getattr(obj, "weight_g", None)),
-            to_num(getattr(obj, "weight_grams", None)),
-        )
-        if g:
-            return int(g)
-        # parse from text
-        return parse_grams_from_text(
-            getattr(obj, "size_text", None), 
-            obj.name, 
-            getattr(obj, "title", None)
-        )
+        return product_grams(obj)
 
     def get_slug(self, obj):
-        if getattr(obj, 'slug', None):
-            return obj.slug
-        grams = self.get_grams(obj)
-        brand_name = obj.brand_display_name
-        base = " ".join([
-            brand_name, 
-            obj.name or "", 
-            f"{grams}g" if grams else ""
-        ]).strip()
-        s = dj_slug(base) or dj_slug(obj.name or "") or f"product-{obj.pk}"
-        return s
+        return product_slug(obj)
+
     def get_name_with_brand(self, obj):
         brand_name = obj.brand if obj.brand else ""
         return f"{brand_name} {obj.name}".strip()
 
     def get_image_url(self, obj):
-        request = self.context.get("request")
-        url = pick_image_url(obj, request) if request else getattr(obj, "image_url", None)
-        if not url and obj.brand:
-            # optional brand fallback path (serve from /static/brands/<brand>.png if you have it)
-            return request.build_absolute_uri(f"/static/brands/{dj_slug(obj.brand_display_name)}.png") if request else None
-        return url
+        return product_image_url(obj, self.context.get("request"))
 
     def get_price(self, obj):
-        store_id = self.context.get("store_id")
-        qs = Price.objects.filter(product=obj)
-        if store_id:
-            qs = qs.filter(store_id=store_id)
-        val = qs.order_by("-recorded_at").values_list("price", flat=True).first()
-        # if amount stored in cents, convert here instead:
-        return float(val) if val is not None else None
+        return product_price(obj, self.context.get("store_id"))
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -191,7 +243,11 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def get_latest_price(self, obj):
         """Get the latest price for this product"""
-        latest_price = obj.prices.order_by('-recorded_at').first()
+        prefetched = getattr(obj, 'store_prices', None)
+        if prefetched is not None:
+            latest_price = prefetched[0] if prefetched else None
+        else:
+            latest_price = obj.prices.order_by('-recorded_at').first()
         if latest_price:
             return {
                 'price': str(latest_price.price),
@@ -356,7 +412,8 @@ class PriceContributionCreateSerializer(serializers.ModelSerializer):
         """Validate that the product exists"""
         from .models import Product
         try:
-            Product.objects.get(id=value)
+            # kept for create(), which would otherwise fetch the same row again
+            self._product = Product.objects.get(id=value)
         except Product.DoesNotExist:
             raise serializers.ValidationError("Product with this ID does not exist.")
         return value
@@ -365,7 +422,7 @@ class PriceContributionCreateSerializer(serializers.ModelSerializer):
         """Validate that the store exists"""
         from .models import Store
         try:
-            Store.objects.get(id=value)
+            self._store = Store.objects.get(id=value)
         except Store.DoesNotExist:
             raise serializers.ValidationError("Store with this ID does not exist.")
         return value
@@ -384,10 +441,9 @@ class PriceContributionCreateSerializer(serializers.ModelSerializer):
             defaults={'email': 'test@example.com'}
         )
         
-        # Get the product and store objects (already validated)
-        from .models import Product, Store
-        product = Product.objects.get(id=validated_data['product_id'])
-        store = Store.objects.get(id=validated_data['store_id'])
+        # Product and store objects were loaded during validation
+        product = self._product
+        store = self._store
         
         # Create the contribution
         contribution = PriceContribution.objects.create(
@@ -585,8 +641,12 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         return obj.get_calorie_burn_equivalents()
 
     def get_prices(self, obj):
+        if 'prices' in getattr(obj, '_prefetched_objects_cache', {}):
+            prices = obj.prices.all()
+        else:
+            prices = obj.prices.select_related('store').order_by('-recorded_at')
         latest_by_store = {}
-        for price in obj.prices.select_related('store').order_by('-recorded_at'):
+        for price in prices:
             store_id = price.store_id
             if store_id in latest_by_store:
                 continue
@@ -605,15 +665,18 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     def get_user_rating(self, obj):
         context_user = self.context.get('current_user')
         if context_user:
-            rating = obj.user_ratings.filter(user=context_user).first()
+            prefetched = getattr(obj, 'current_user_rating', None)
+            if prefetched is not None:
+                rating = prefetched[0] if prefetched else None
+            else:
+                rating = obj.user_ratings.filter(user=context_user).first()
             return ProductUserRatingSerializer(rating).data if rating else None
         request = self.context.get('request')
         if not request:
             return None
         user = request.user if request.user and request.user.is_authenticated else None
         if not user:
-            headers = getattr(request, 'headers', {}) if hasattr(request, 'headers') else {}
-            username = headers.get('X-ButterUp-User') or headers.get('x-butterup-user')
+            username = request.META.get('HTTP_X_BUTTERUP_USER')
             if username:
                 from django.contrib.auth import get_user_model
                 UserModel = get_user_model()
@@ -8,9 +8,11 @@ import hashlib
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from django.core.cache import caches
 
@@ -63,8 +65,16 @@ class OFFClient:
         self.max_retries: int = 2
         self.retry_backoff: float = 0.5
         self.cache_timeout: int = int(getattr(settings, "OFF_CACHE_TIMEOUT", 3600))
+        # Timeouts and 5xx are transient; don't pin them for the full cache lifetime
+        self.error_cache_timeout: int = int(getattr(settings, "OFF_ERROR_CACHE_TIMEOUT", 60))
+        self.fill_lock_timeout: int = 5
         self.cache_prefix: str = getattr(settings, "OFF_CACHE_PREFIX", "off-cache")
         self.cache = caches["default"]
+        # Batch lookups fan out over a small thread pool; OFF asks clients to stay gentle
+        self.batch_concurrency: int = max(1, int(getattr(settings, "OFF_BATCH_CONCURRENCY", 4)))
+        # Keep-alive pool shared by those threads, so each lookup skips the TCP+TLS handshake
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=self.batch_concurrency))
 
     # ------------------------------------------------------------------ #
     # Public API methods
@@ -158,6 +168,7 @@ class OFFClient:
         items: List[Dict[str, Any]] = []
         not_found: List[str] = []
         invalid: List[str] = []
+        valid: List[str] = []
         seen: set[str] = set()
 
         for code in codes:
@@ -169,8 +180,15 @@ class OFFClient:
             if not self._validate_gtin(code_str):
                 invalid.append(code_str)
                 continue
+            valid.append(code_str)
 
-            product = self.get_product(code_str, fields=fields)
+        # Upstream round trips overlap instead of running back to back; map() keeps input order
+        products: List[Optional[Dict[str, Any]]] = []
+        if valid:
+            with ThreadPoolExecutor(max_workers=min(self.batch_concurrency, len(valid))) as pool:
+                products = list(pool.map(lambda code: self.get_product(code, fields=fields), valid))
+
+        for code_str, product in zip(valid, products):
             if product:
                 items.append(product)
             else:
@@ -209,13 +227,29 @@ class OFFClient:
         if cached is not _CACHE_SENTINEL:
             return cached
 
+        # One caller fills a cold key; the others briefly wait for its result
+        lock_key = f"{cache_key}:filling"
+        filling = self.cache.add(lock_key, True, self.fill_lock_timeout)
+        if not filling:
+            for _ in range(self.fill_lock_timeout * 10):
+                time.sleep(0.1)
+                cached = self.cache.get(cache_key, _CACHE_SENTINEL)
+                if cached is not _CACHE_SENTINEL:
+                    return cached
+        try:
+            return self._request_upstream(path, params, cache_key)
+        finally:
+            if filling:
+                self.cache.delete(lock_key)
+
+    def _request_upstream(self, path: str, params: Dict[str, Any], cache_key: str) -> Optional[Dict[str, Any]]:
         url = f"{self.base_url}{path}"
         headers = {"User-Agent": self.user_agent}
         last_exception: Optional[BaseException] = None
 
         for attempt in range(self.max_retries + 1):
             try:
-                response = requests.get(url, params=params, headers=headers, timeout=self.timeout)
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
 
                 if response.status_code == 404:
                     logger.info("OFF returned 404 for %s with params=%s", path, params)
@@ -233,7 +267,7 @@ class OFFClient:
                     if attempt < self.max_retries:
                         time.sleep(self.retry_backoff * (attempt + 1))
                         continue
-                    self.cache.set(cache_key, None, self.cache_timeout)
+                    self.cache.set(cache_key, None, self.error_cache_timeout)
                     return None
 
                 if response.status_code >= 400:
@@ -278,7 +312,7 @@ class OFFClient:
 
         if last_exception:
             logger.debug("OFF request giving up after exception: %s", last_exception)
-        self.cache.set(cache_key, None, self.cache_timeout)
+        self.cache.set(cache_key, None, self.error_cache_timeout)
         return None
 
     def _build_cache_key(self, path: str, params: Dict[str, Any]) -> str:
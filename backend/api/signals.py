@@ -0,0 +1,49 @@
+"""
+Signal handlers that keep cached API payloads in step with the data.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Price, Store
+
+PRICE_GENERATION_KEY = 'prices:generation'
+STORE_CHAINS_CACHE_KEY = 'stores:chains'
+GUEST_USERNAME = 'butterup-guest'
+GUEST_USER_CACHE_KEY = f'user_pk:{GUEST_USERNAME}'
+LIST_USERNAME = 'test_user'
+LIST_USER_CACHE_KEY = f'user_pk:{LIST_USERNAME}'
+
+
+def price_generation() -> int:
+    """Return a counter that changes whenever a Price row is saved or deleted.
+
+    Bumps only reach other processes through a shared cache (Redis when REDIS_URL
+    is set), and writes that skip signals (QuerySet.update, bulk_create) don't bump
+    it unless the caller does, so every payload keyed on it also keeps a short TTL
+    as the actual bound on staleness.
+    """
+    return cache.get_or_set(PRICE_GENERATION_KEY, 0, None)
+
+
+@receiver([post_save, post_delete], sender=Price)
+def bump_price_generation(sender, **kwargs):
+    try:
+        cache.incr(PRICE_GENERATION_KEY)
+    except ValueError:
+        cache.set(PRICE_GENERATION_KEY, 1, None)
+
+
+@receiver([post_save, post_delete], sender=Store)
+def forget_store_chains(sender, **kwargs):
+    cache.delete(STORE_CHAINS_CACHE_KEY)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_shared_user(sender, instance, **kwargs):
+    if instance.username == GUEST_USERNAME:
+        cache.delete(GUEST_USER_CACHE_KEY)
+    elif instance.username == LIST_USERNAME:
+        cache.delete(LIST_USER_CACHE_KEY)
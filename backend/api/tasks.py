@@ -6,6 +6,11 @@ import logging
 from typing import Dict, Any
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, OperationalError
 from .models import Product, ImageAsset
 from .services.off_client import OFFClient
 from .services.gs1_client import GS1Client
@@ -137,12 +142,12 @@ def cleanup_old_images(self, days_old: int = 30) -> Dict[str, Any]:
         cutoff_date = timezone.now() - timedelta(days=days_old)
         
         # Find old inactive assets
-        old_assets = ImageAsset.objects.filter(
+        old_assets = list(ImageAsset.objects.filter(
             is_active=False,
             last_fetched_at__lt=cutoff_date
-        )
+        ))
         
-        count = old_assets.count()
+        count = len(old_assets)
         logger.info(f"Found {count} old inactive assets to clean up")
         
         # Delete old assets
@@ -177,6 +182,94 @@ def cleanup_old_images(self, days_old: int = 30) -> Dict[str, Any]:
         raise
 
 
+@shared_task(
+    bind=True,
+    queue='images',
+    # Storage hiccups and lost/locked DB connections; the staged file stays for the retry
+    autoretry_for=(OSError, OperationalError),
+    max_retries=3,
+    retry_backoff=True,
+)
+def process_scan_upload(self, asset_id: int, staged_path: str, filename: str):
+    """
+    Attach a staged scan photo to its pending ImageAsset.
+    
+    ScanSubmitAPIView creates the asset inactive and stages the upload; saving it
+    here moves the storage write plus the dimension/size/checksum work off the request.
+    
+    Args:
+        asset_id: Pending ImageAsset id
+        staged_path: Storage path the upload was staged to
+        filename: Original upload filename
+        
+    Returns:
+        Serialized ImageAsset dict if successful, None otherwise
+    """
+    try:
+        asset = ImageAsset.objects.get(id=asset_id)
+    except ImageAsset.DoesNotExist:
+        logger.warning(f"Scan upload {staged_path} has no asset {asset_id}; discarding")
+        default_storage.delete(staged_path)
+        return None
+    
+    try:
+        with default_storage.open(staged_path, 'rb') as fh:
+            # Drop the pending placeholder so save() computes the real checksum
+            asset.checksum = ''
+            asset.is_active = True
+            asset.file.save(filename, File(fh), save=True)
+    except IntegrityError:
+        # The same photo is already stored for this product/store/source: drop the
+        # pending asset along with the staged and freshly stored copies
+        logger.info(f"Scan upload for asset {asset_id} duplicates an existing image; discarding")
+        if asset.file.name:
+            default_storage.delete(asset.file.name)
+        ImageAsset.objects.filter(id=asset_id).delete()
+        default_storage.delete(staged_path)
+        return None
+    except Exception as e:
+        # The staged file is kept so the task can be retried; a copy already
+        # written to storage is not, so a retry doesn't leave it orphaned
+        if asset.file.name:
+            default_storage.delete(asset.file.name)
+        logger.error(f"Error processing scan upload for asset {asset_id}: {e}")
+        raise
+    
+    default_storage.delete(staged_path)
+    logger.info(f"Stored scan upload for asset {asset_id}")
+    return _serialize_image_asset(asset)
+
+
+@shared_task(bind=True)
+def refresh_sign_in_jwks(self) -> Dict[str, Any]:
+    """
+    Refetch the Google and Apple signing keys ahead of their cache expiry.
+    
+    Keeps the JWKs cache warm so sign-in requests verify tokens without
+    blocking a web worker on the identity provider's HTTPS round trip. Only
+    useful with a shared cache (REDIS_URL); with the per-process LocMemCache
+    the keys would land in this worker's memory, so it does nothing.
+    
+    Returns:
+        Number of keys cached per provider URL
+    """
+    if isinstance(caches['default'], LocMemCache):
+        logger.info("Skipping JWKs refresh: the cache is not shared with web workers")
+        return {}
+    
+    # views imports this module; import lazily to avoid the cycle
+    from .views import APPLE_JWKS_URL, GOOGLE_JWKS_URL, _get_jwks
+    
+    result = {}
+    for url in (GOOGLE_JWKS_URL, APPLE_JWKS_URL):
+        try:
+            result[url] = len(_get_jwks(url, refresh=True))
+        except Exception as e:
+            # Leave any cached keys in place; the request path refetches on a miss
+            logger.warning(f"Could not refresh JWKs from {url}: {e}")
+    return result
+
+
 def _validate_gtin(gtin: str) -> bool:
     """Validate GTIN format"""
     if not gtin or not gtin.isdigit():
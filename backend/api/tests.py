@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from .models import Price, Product, ProductScoreSnapshot, Store
+from .serializers import StoreSerializer
+
+
+class ProductDetailEndpointTests(APITestCase):
+    """The detail and rating views load products through the shared queryset templates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Albany', chain='paknsave', city='Auckland')
+        cls.product = Product.objects.create(name='Salted Butter', brand='Anchor', weight_grams=500)
+        cls.alternative = Product.objects.create(name='Olive Spread', brand='Olivani', weight_grams=500)
+        cls.product.healthy_alternatives.add(cls.alternative)
+        ProductScoreSnapshot.objects.create(product=cls.product, overall_score=Decimal('7.5'))
+        ProductScoreSnapshot.objects.create(product=cls.alternative, overall_score=Decimal('8.0'))
+        Price.objects.create(store=cls.store, product=cls.product, price=Decimal('6.49'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail(self):
+        response = self.client.get(f'/api/products/{self.product.slug}/detail/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.product.id)
+        self.assertEqual([alt['id'] for alt in response.data['healthy_alternatives']], [self.alternative.id])
+
+    def test_ratings_get(self):
+        response = self.client.get(f'/api/products/{self.product.slug}/ratings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['user_rating'])
+
+    def test_ratings_post(self):
+        response = self.client.post(
+            f'/api/products/{self.product.slug}/ratings/',
+            {'cost_score': 8, 'texture_score': 7, 'recipe_score': 9},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rating']['overall_score'], '8.0')
+        self.assertEqual(response.data['product']['id'], self.product.id)
+
+
+class PriceListQueryTests(APITestCase):
+    """Pin the query count of the price list so a pruned column can't fan out per row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name='Albany', chain='paknsave', city='Auckland')
+        for i in range(20):
+            product = Product.objects.create(name=f'Butter {i}', brand='Anchor', weight_grams=500)
+            Price.objects.create(store=cls.store, product=product, price=Decimal('6.49'))
+
+    def test_list(self):
+        # count + prices page + image_assets prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/prices/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['price_per_100g_cents'], 130)
+
+    def test_list_cursor(self):
+        # prices page + image_assets prefetch; no COUNT for keyset pages
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/prices/?pagination=cursor')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_latest(self):
+        # latest prices + image_assets prefetch
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/prices/latest/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+
+    def test_by_store_latest(self):
+        # store lookup + chain prices + image_assets prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/prices/by-store/{self.store.id}/latest/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+
+
+class StoreSerializerTests(APITestCase):
+
+    def test_coordinates_render_as_decimal_strings(self):
+        store = Store(name='Albany', chain='paknsave', latitude=-36.7285, longitude=174.7081)
+        data = StoreSerializer(store).data
+        self.assertEqual(data['latitude'], '-36.728500')
+        self.assertEqual(data['longitude'], '174.708100')
+        self.assertIsNone(StoreSerializer(Store(name='Albany', chain='paknsave')).data['latitude'])
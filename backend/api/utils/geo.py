@@ -3,37 +3,99 @@ Geospatial helper functions for store proximity checks.
 """
 
 import math
-from typing import Iterable, Optional, Tuple
+from typing import Sequence, Tuple
+
+import numpy as np
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; haversine_m_many falls back to plain NumPy
+    njit = None
+    prange = range
 
 EARTH_R = 6_371_000.0  # meters
 
+# Below this many points, thread start-up costs more than the parallel kernel saves
+PARALLEL_MIN_POINTS = 10_000
+
+
+def _haversine_kernel(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Loop form of haversine_m_many, written for numba to compile to a single pass into out."""
+    lat0 = math.radians(lat)
+    lon0 = math.radians(lon)
+    cos_lat0 = math.cos(lat0)
+    for i in prange(lats.shape[0]):
+        lat_i = math.radians(lats[i])
+        a = (
+            math.sin((lat_i - lat0) / 2) ** 2
+            + cos_lat0 * math.cos(lat_i) * math.sin((math.radians(lons[i]) - lon0) / 2) ** 2
+        )
+        out[i] = 2 * EARTH_R * math.asin(math.sqrt(a))
+    return out
+
+
+if njit is not None:
+    _haversine_jit = njit(fastmath=True, cache=True)(_haversine_kernel)
+    _haversine_jit_parallel = njit(parallel=True, fastmath=True, cache=True)(_haversine_kernel)
+else:
+    _haversine_jit = _haversine_jit_parallel = None
+
+
+def warm_up() -> None:
+    """Compile (or load the cached) numba kernels so the first request doesn't pay for it."""
+    if _haversine_jit is not None:
+        _haversine_jit(0.0, 0.0, np.zeros(1), np.zeros(1), np.empty(1))
+        _haversine_jit_parallel(0.0, 0.0, np.zeros(1), np.zeros(1), np.empty(1))
+
 
-def haversine_m(lat1, lon1, lat2, lon2) -> float:
-    """Return distance in meters between two lat/lon coordinates (accepts Decimal/str/float)."""
-    lat1 = float(lat1)
-    lon1 = float(lon1)
-    lat2 = float(lat2)
-    lon2 = float(lon2)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
+def haversine_m_many(lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Vectorised haversine: distances in meters from one point to arrays of points."""
+    if _haversine_jit is not None:
+        lats = np.ascontiguousarray(lats, dtype=np.float64)
+        lons = np.ascontiguousarray(lons, dtype=np.float64)
+        kernel = _haversine_jit_parallel if lats.shape[0] >= PARALLEL_MIN_POINTS else _haversine_jit
+        return kernel(float(lat), float(lon), lats, lons, np.empty(lats.shape[0], dtype=np.float64))
+    lat0 = math.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
     a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(dlon / 2) ** 2
+        np.sin((lats - lat0) / 2) ** 2
+        + math.cos(lat0) * np.cos(lats) * np.sin((lons - math.radians(lon)) / 2) ** 2
     )
-    return 2 * EARTH_R * math.asin(math.sqrt(a))
-
-
-def nearest_store(stores: Iterable, lat: float, lon: float, radius_m: float = 300.0) -> Tuple[Optional[object], Optional[float]]:
-    """Return the closest store within the provided radius, otherwise (None, None)."""
-    best = (None, None)
-    for store in stores:
-        if getattr(store, "latitude", None) is None or getattr(store, "longitude", None) is None:
-            continue
-        dist = haversine_m(lat, lon, store.latitude, store.longitude)
-        if best[0] is None or dist < best[1]:
-            best = (store, dist)
-    if best[0] and best[1] <= radius_m:
-        return best
-    return (None, None)
+    return 2 * EARTH_R * np.arcsin(np.sqrt(a))
+
+
+def haversine_m_expression(lat: float, lon: float, lat_field: str = "latitude", lon_field: str = "longitude"):
+    """Haversine distance in meters as a query expression, so the database computes distances to (lat, lon)."""
+    lat0 = math.radians(lat)
+    lat_r = Radians(F(lat_field))
+    a = (
+        Power(Sin((lat_r - Value(lat0)) / 2), 2)
+        + Value(math.cos(lat0)) * Cos(lat_r) * Power(Sin((Radians(F(lon_field)) - Value(math.radians(lon))) / 2), 2)
+    )
+    return Value(2 * EARTH_R) * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing radius_m around a point."""
+    dlat = math.degrees(radius_m / EARTH_R)
+    dlon = math.degrees(radius_m / (EARTH_R * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def bounding_box_q(lat: float, lon: float, radius_m: float, lat_field: str = "latitude", lon_field: str = "longitude") -> Q:
+    """bounding_box as an index-friendly range filter, split in two where it crosses the antimeridian."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_m)
+    in_lat = Q(**{f"{lat_field}__range": (max(min_lat, -90.0), min(max_lat, 90.0))})
+    if max_lon - min_lon >= 360:
+        return in_lat
+    # e.g. the Chathams sit just east of 180 while most of NZ sits west of it
+    if min_lon < -180:
+        in_lon = Q(**{f"{lon_field}__gte": min_lon + 360}) | Q(**{f"{lon_field}__lte": max_lon})
+    elif max_lon > 180:
+        in_lon = Q(**{f"{lon_field}__gte": min_lon}) | Q(**{f"{lon_field}__lte": max_lon - 360})
+    else:
+        in_lon = Q(**{f"{lon_field}__range": (min_lon, max_lon)})
+    return in_lat & in_lon
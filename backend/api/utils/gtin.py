@@ -4,13 +4,17 @@ GTIN normalization and validation helpers.
 
 import re
 
+_NONDIGIT = re.compile(r"[^0-9]")  # not \D, which keeps non-ASCII digits (e.g. Arabic-Indic)
+
+# Byte -> digit value tables; weights alternate 3, 1, 3, ... from the rightmost digit.
+_W3 = bytes(((c - 0x30) * 3) if 0x30 <= c <= 0x39 else 0 for c in range(256))
+_W1 = bytes((c - 0x30) if 0x30 <= c <= 0x39 else 0 for c in range(256))
+
 
 def _check_digit_mod10(body: str) -> str:
     """Compute the GS1 Mod-10 checksum for a GTIN body."""
-    s, w = 0, 3
-    for d in reversed(body):
-        s += int(d) * w
-        w = 1 if w == 3 else 3
+    raw = body.encode("ascii")
+    s = sum(raw[-1::-2].translate(_W3)) + sum(raw[-2::-2].translate(_W1))
     return str((10 - (s % 10)) % 10)
 
 
@@ -21,7 +25,7 @@ def normalize_gtin(raw: str) -> str:
     Raises:
         ValueError: If the length is unsupported or checksum invalid.
     """
-    digits = re.sub(r"\D", "", str(raw or ""))
+    digits = _NONDIGIT.sub("", str(raw or ""))
     if len(digits) == 12:  # UPC-A -> pad to EAN-13
         digits = "0" + digits
     if len(digits) not in (8, 13, 14):
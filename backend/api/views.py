@@ -6,25 +6,38 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg, Min, Max, Count, Q
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Min, Max, Count, Q, F, Case, When, Exists, FloatField, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, NullIf, RowNumber, Trim
 from django.utils import timezone
 from datetime import timedelta
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.http import Http404
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from rest_framework_simplejwt.tokens import RefreshToken
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from jose import jwt
 from jose.exceptions import JWTError
 import logging
 from typing import List, Dict, Optional
 import os
 import hashlib
-from collections import OrderedDict
-from decimal import Decimal, InvalidOperation
+import re
+import time
+import uuid
+from functools import lru_cache
+from decimal import Decimal
+import numpy as np
 
 from .models import (
     Store, Product, Price, EconomicIndicator, PriceAlert, EmailSubscription,
@@ -32,7 +45,7 @@ from .models import (
     ProductScoreSnapshot, ProductUserRating
 )
 from .serializers import (
-    StoreSerializer, ProductSerializer, PriceSerializer, EconomicIndicatorSerializer,
+    StoreSerializer, NearbyStoreSerializer, ProductSerializer, PriceSerializer, EconomicIndicatorSerializer,
     PriceAlertSerializer, EmailSubscriptionSerializer, ScrapingLogSerializer,
     PriceTrendSerializer, StoreComparisonSerializer, EconomicCorrelationSerializer,
     DetailedImageAssetSerializer, ImageFetchResponseSerializer,
@@ -41,13 +54,18 @@ from .serializers import (
     PriceContributionSerializer, PriceContributionCreateSerializer, UserProfileSerializer,
     QuickCompareBrandSerializer, QuickCompareStoreSnapshotSerializer,
     ProductDetailSerializer, ProductUserRatingSerializer,
-    ProductRatingSubmissionSerializer, pick_image_url
+    ProductRatingSubmissionSerializer, pick_image_url, product_list_rows
 )
 from .services.image_cache import ImageCacheService
 from .services.off_client import OFFClient
 from .services.gs1_client import GS1Client
-from .tasks import fetch_product_image
+from .signals import (
+    GUEST_USERNAME, GUEST_USER_CACHE_KEY, LIST_USERNAME, LIST_USER_CACHE_KEY,
+    STORE_CHAINS_CACHE_KEY, bump_price_generation, price_generation,
+)
+from .tasks import fetch_product_image, process_scan_upload
 from .utils.gtin import normalize_gtin
+from .utils.geo import bounding_box_q, haversine_m_expression, haversine_m_many
 
 logger = logging.getLogger(__name__)
 off_client = OFFClient()
@@ -62,16 +80,54 @@ def _parse_fields_param(raw: Optional[str]) -> Optional[List[str]]:
 
 OFF_MAX_PAGE_SIZE = 50
 OFF_MAX_BATCH_SIZE = 50
+QUICK_COMPARE_CACHE_TIMEOUT = 300
+QUICK_COMPARE_STALE_TIMEOUT = 24 * 60 * 60
+STORE_CHAINS_CACHE_TIMEOUT = 300
+CHEAPEST_CACHE_TIMEOUT = 60
+# First amount in typed price text: "$4.99", "NZ$ 1,299.00", "4.99 NZD"
+PRICE_TEXT_RE = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
+
+class AuthRateThrottle(AnonRateThrottle):
+    scope = "auth"
+
+
+class RegisterRateThrottle(AnonRateThrottle):
+    scope = "register"
 
 
 def _gravatar_url(email: str) -> str:
     """Return a gravatar/identicon URL for an email (works for empty emails too)."""
-    safe_email = (email or "").strip().lower()
-    digest = hashlib.md5(safe_email.encode("utf-8")).hexdigest()
+    return _gravatar_url_for((email or "").strip().lower())
+
+
+@lru_cache(maxsize=8192)
+def _gravatar_url_for(normalised_email: str) -> str:
+    # Gravatar mandates MD5; memoised on the normalised email so repeat sign-ins skip the hash
+    digest = hashlib.md5(normalised_email.encode("utf-8")).hexdigest()
     # d=identicon gives a nice fallback if no gravatar exists
     return f"https://www.gravatar.com/avatar/{digest}?d=identicon"
+
+
+def _social_user(email: str, username: str):
+    """Find or create the account for a verified social sign-in in one get_or_create.
+
+    Keyed by email when the provider shares one, else by the provider-scoped username;
+    either way the unique username decides concurrent first sign-ins.
+    """
+    User = get_user_model()
+    if not email:
+        return User.objects.get_or_create(username=username)[0]
+    try:
+        return User.objects.get_or_create(email=email, defaults={'username': email})[0]
+    except User.MultipleObjectsReturned:
+        # email isn't unique on the auth table; keep the old first-match behaviour
+        return User.objects.filter(email=email).first()
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterRateThrottle]
 
     def post(self, request):
         email = (request.data.get('email') or '').strip().lower()
@@ -80,15 +136,23 @@ class RegisterView(APIView):
         if not email or not password:
             return Response({'detail': 'Email and password are required'}, status=400)
         User = get_user_model()
-        if User.objects.filter(email=email).exists():
+        # username=email is unique, so a concurrent duplicate loses at the DB and is re-read here.
+        # The password is a callable default: it is only hashed when a row is actually created.
+        try:
+            user, created = User.objects.get_or_create(
+                email=email,
+                defaults={
+                    'username': email,
+                    'first_name': name.split(' ')[0] if name else '',
+                    'last_name': ' '.join(name.split(' ')[1:]) if name and len(name.split(' '))>1 else '',
+                    'password': lambda: make_password(password),
+                },
+            )
+        except User.MultipleObjectsReturned:
+            # email isn't unique on the auth table; several rows already use this one
+            created = False
+        if not created:
             return Response({'detail': 'Email already registered'}, status=400)
-        user = User.objects.create(
-            username=email,
-            email=email,
-            first_name=name.split(' ')[0] if name else '',
-            last_name=' '.join(name.split(' ')[1:]) if name and len(name.split(' '))>1 else '',
-            password=make_password(password),
-        )
         refresh = RefreshToken.for_user(user)
         avatar_url = _gravatar_url(user.email)
         return Response({
@@ -104,8 +168,70 @@ class RegisterView(APIView):
         })
 
 
+GOOGLE_JWKS_URL = 'https://www.googleapis.com/oauth2/v3/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+APPLE_JWKS_URL = 'https://appleid.apple.com/auth/keys'
+JWKS_CACHE_TIMEOUT = 3600
+JWKS_MIN_REFRESH_INTERVAL = 300
+
+# Keep-alive pool for identity-provider calls, so a JWKs miss doesn't pay a fresh TCP+TLS handshake
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.2, allowed_methods=frozenset({'GET'})),
+))
+
+
+def _get_jwks(url: str, ttl: int = JWKS_CACHE_TIMEOUT, refresh: bool = False) -> Dict[str, dict]:
+    """Return a provider's signing keys indexed by kid, cached for ttl seconds."""
+    cache_key = f"jwks:{url}"
+    keys = None if refresh else cache.get(cache_key)
+    if keys is None:
+        resp = _http.get(url, timeout=5)
+        resp.raise_for_status()
+        keys = {k['kid']: k for k in resp.json().get('keys', [])}
+        cache.set(cache_key, keys, ttl)
+    return keys
+
+
+def _jwk_for_token(url: str, id_token: str):
+    """Return (header, key) for id_token, refetching the key set once if the kid is new."""
+    header = jwt.get_unverified_header(id_token)
+    kid = header.get('kid')
+    key = _get_jwks(url).get(kid)
+    # Unknown kid: the provider may have rotated keys. Rate-limit refetches so bogus
+    # kids can't turn every request back into an outbound call.
+    if key is None and cache.add(f"jwks-refresh:{url}", True, JWKS_MIN_REFRESH_INTERVAL):
+        key = _get_jwks(url, refresh=True).get(kid)
+    return header, key
+
+
+VERIFIED_TOKEN_CACHE_TIMEOUT = 30
+
+
+def _verified_claims(cache_scope: str, id_token: str, verify):
+    """Return claims for an already-verified id_token, or run verify() and remember them.
+
+    Retrying clients often replay the same token within seconds. Entries live at most
+    VERIFIED_TOKEN_CACHE_TIMEOUT seconds and never past the token's exp; failures
+    (verify() raising or returning None) are never cached.
+    """
+    digest = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+    cache_key = f"verified-jwt:{cache_scope}:{digest}"
+    claims = cache.get(cache_key)
+    if claims is None:
+        claims = verify()
+        if claims is not None:
+            ttl = min(VERIFIED_TOKEN_CACHE_TIMEOUT, int(claims.get('exp', 0) - time.time()))
+            if ttl > 0:
+                cache.set(cache_key, claims, ttl)
+    return claims
+
+
 class GoogleAuthView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
 
     def post(self, request):
         id_token = request.data.get('id_token')
@@ -113,12 +239,24 @@ class GoogleAuthView(APIView):
         _client_aud = request.data.get('aud')
         if not id_token:
             return Response({'detail': 'id_token required'}, status=400)
-        # Verify with Google tokeninfo (simpler) or JWKs (more robust)
+        # Verify locally against Google's cached JWKs (no tokeninfo round trip)
         try:
-            resp = requests.get('https://oauth2.googleapis.com/tokeninfo', params={'id_token': id_token}, timeout=5)
-            if resp.status_code != 200:
+            def verify():
+                _header, key = _jwk_for_token(GOOGLE_JWKS_URL, id_token)
+                if not key:
+                    return None
+                return jwt.decode(
+                    id_token,
+                    key,
+                    algorithms=['RS256'],
+                    issuer=GOOGLE_ISSUERS,
+                    # aud is checked against the env allow-list below; no access token to pair at_hash with
+                    options={'verify_aud': False, 'verify_at_hash': False},
+                )
+
+            data = _verified_claims('google', id_token, verify)
+            if data is None:
                 return Response({'detail': 'Invalid Google token'}, status=400)
-            data = resp.json()
             # Server-side audience check using env (supports comma-separated list)
             allowed = os.getenv('GOOGLE_CLIENT_IDS') or os.getenv('GOOGLE_CLIENT_ID', '')
             allowed_list = [a.strip() for a in allowed.split(',') if a.strip()]
@@ -132,11 +270,7 @@ class GoogleAuthView(APIView):
             family_name = data.get('family_name') or ''
             if not email and not sub:
                 return Response({'detail': 'Token missing subject/email'}, status=400)
-            User = get_user_model()
-            user = User.objects.filter(email=email).first() if email else None
-            if not user:
-                username = email or f'google_{sub}'
-                user = User.objects.create(username=username, email=email)
+            user = _social_user(email, f'google_{sub}')
             # Update names if available (best-effort)
             if (given_name or family_name) and (not user.first_name and not user.last_name):
                 try:
@@ -159,6 +293,8 @@ class GoogleAuthView(APIView):
                     'provider': 'google',
                 }
             })
+        except JWTError:
+            return Response({'detail': 'Invalid Google token'}, status=400)
         except Exception as e:
             logger.exception('Google verification failed')
             return Response({'detail': 'Google verification failed'}, status=400)
@@ -166,6 +302,7 @@ class GoogleAuthView(APIView):
 
 class AppleAuthView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
 
     def post(self, request):
         id_token = request.data.get('id_token')
@@ -174,29 +311,28 @@ class AppleAuthView(APIView):
         if not id_token:
             return Response({'detail': 'id_token required'}, status=400)
         try:
-            # Fetch Apple JWKs
-            jwks = requests.get('https://appleid.apple.com/auth/keys', timeout=5).json()
-            header = jwt.get_unverified_header(id_token)
-            key = next((k for k in jwks['keys'] if k['kid'] == header.get('kid')), None)
-            if not key:
-                return Response({'detail': 'Apple key not found'}, status=400)
             audience = env_aud or aud
-            payload = jwt.decode(
-                id_token,
-                key,
-                algorithms=[header.get('alg')],
-                audience=audience,
-                issuer='https://appleid.apple.com'
-            )
+
+            def verify():
+                # Apple JWKs, cached
+                header, key = _jwk_for_token(APPLE_JWKS_URL, id_token)
+                if not key:
+                    return None
+                return jwt.decode(
+                    id_token,
+                    key,
+                    algorithms=[header.get('alg')],
+                    audience=audience,
+                    issuer='https://appleid.apple.com'
+                )
+
+            # The audience is part of verification, so it is part of the cache scope too
+            payload = _verified_claims(f'apple:{audience}', id_token, verify)
+            if payload is None:
+                return Response({'detail': 'Apple key not found'}, status=400)
             sub = payload.get('sub')
             email = (payload.get('email') or '').lower()
-            User = get_user_model()
-            user = None
-            if email:
-                user = User.objects.filter(email=email).first()
-            if not user:
-                username = email or f'apple_{sub}'
-                user = User.objects.create(username=username, email=email)
+            user = _social_user(email, f'apple_{sub}')
             refresh = RefreshToken.for_user(user)
             avatar_url = _gravatar_url(user.email)
             name = user.get_full_name() or user.username or user.email or 'Apple User'
@@ -218,18 +354,165 @@ class AppleAuthView(APIView):
             return Response({'detail': 'Apple verification failed'}, status=400)
 
 
-def _product_detail_queryset():
+# Product columns PriceSerializer never renders; everything else on the row is needed
+PRICE_DEFERRED_FIELDS = ('product__image', 'product__versatility_tags')
+
+# Product columns the rating and alternative payloads never render
+PRODUCT_WIDE_FIELDS = ('image', 'versatility_tags', 'gtin', 'created_at', 'updated_at')
+
+RATING_SUMMARY_FIELDS = {
+    'rating_avg_overall': 'overall_score',
+    'rating_avg_cost': 'cost_score',
+    'rating_avg_texture': 'texture_score',
+    'rating_avg_recipe': 'recipe_score',
+}
+
+
+def _with_rating_summary(queryset):
+    """Annotate the community rating aggregates Product.get_user_rating_summary reads."""
+    return queryset.annotate(
+        **{name: Avg(f'user_ratings__{field}') for name, field in RATING_SUMMARY_FIELDS.items()},
+        rating_count=Count('user_ratings'),
+    )
+
+
+def _refresh_rating_summary(product):
+    """Recompute the annotated rating aggregates on an already-loaded product in one query."""
+    stats = product.user_ratings.aggregate(
+        **{name: Avg(field) for name, field in RATING_SUMMARY_FIELDS.items()},
+        rating_count=Count('id'),
+    )
+    for name, value in stats.items():
+        setattr(product, name, value)
+
+
+def _with_user_rating(queryset, user):
+    """Prefetch the given user's rating (if any) into current_user_rating."""
+    if user is None:
+        return queryset
+    return queryset.prefetch_related(Prefetch(
+        'user_ratings',
+        queryset=ProductUserRating.objects.filter(user=user),
+        to_attr='current_user_rating',
+    ))
+
+
+# The base querysets below are built once per process and never evaluated directly;
+# callers get an .all() clone, so no result cache is ever shared between requests.
+@lru_cache(maxsize=1)
+def _product_detail_template():
+    # Alternatives only render id/slug/name/brand plus the blended score. Wide columns are
+    # deferred rather than .only()-ing the rest: score_snapshot is traversed by
+    # select_related, which Django rejects on an .only() queryset that leaves it out
+    alternatives = _with_rating_summary(
+        Product.objects.defer(*PRODUCT_WIDE_FIELDS).select_related('score_snapshot')
+    )
     return (
-        Product.objects.filter(is_active=True)
+        _with_rating_summary(Product.objects.filter(is_active=True))
+        .defer('gtin', 'created_at', 'updated_at')
         .select_related('score_snapshot', 'nutrition_profile')
         .prefetch_related(
-            'healthy_alternatives__score_snapshot',
-            'healthy_alternatives__nutrition_profile',
-            'prices__store',
-            'user_ratings__user'
+            Prefetch('healthy_alternatives', queryset=alternatives),
+            # Newest first, as ProductDetailSerializer.get_prices walks it
+            Prefetch('prices', queryset=Price.objects.select_related('store').order_by('-recorded_at')),
         )
     )
 
+
+@lru_cache(maxsize=1)
+def _product_rating_template():
+    return (
+        _with_rating_summary(Product.objects.filter(is_active=True).defer(*PRODUCT_WIDE_FIELDS))
+        .select_related('score_snapshot')
+    )
+
+
+def _product_detail_queryset(user=None):
+    return _with_user_rating(_product_detail_template().all(), user)
+
+
+def _product_rating_queryset(user=None):
+    """Thin variant for the rating GET: scores, community summary and the caller's rating only."""
+    return _with_user_rating(_product_rating_template().all(), user)
+
+
+def _get_detail_product(identifier, user=None, queryset=None) -> Product:
+    """Look a product up by pk (numeric identifiers) or case-insensitive slug, one predicate per query."""
+    if queryset is None:
+        queryset = _product_detail_queryset(user)
+    identifier = str(identifier)
+    product = None
+    if identifier.isdigit():
+        product = queryset.filter(pk=int(identifier)).first()
+    if product is None:
+        product = queryset.filter(slug__iexact=identifier).first()
+    if not product:
+        raise Http404("Product not found")
+    return product
+
+
+def _product_detail_etag(request, slug):
+    """Cheap fingerprint of everything ProductDetailSerializer renders for this request.
+
+    Built only from this product's own rows, so it changes whichever process wrote
+    them: the product row, its score snapshot and nutrition profile, its prices
+    (count, newest recorded_at and a price sum that catches in-place edits), ratings
+    and snapshots of the product and its healthy alternatives, the requesting user
+    and the host used for absolute image URLs. Edits to the healthy_alternatives
+    M2M alone are not tracked.
+    """
+    identifier = str(slug)
+    products = Product.objects.filter(is_active=True)
+    columns = ('pk', 'updated_at', 'score_snapshot__updated_at', 'nutrition_profile__updated_at')
+    row = None
+    if identifier.isdigit():
+        row = products.filter(pk=int(identifier)).values_list(*columns).first()
+    if row is None:
+        row = products.filter(slug__iexact=identifier).values_list(*columns).first()
+    if row is None:
+        return None  # let the view raise its 404
+    pk = row[0]
+    alternative_ids = Product.healthy_alternatives.through.objects.filter(
+        from_product_id=pk
+    ).values('to_product_id')
+    prices = Price.objects.filter(product_id=pk).aggregate(
+        last=Max('recorded_at'), count=Count('id'), total=Sum('price')
+    )
+    ratings = ProductUserRating.objects.filter(
+        Q(product_id=pk) | Q(product_id__in=alternative_ids)
+    ).aggregate(last=Max('updated_at'), count=Count('id'))
+    snapshots = ProductScoreSnapshot.objects.filter(
+        product_id__in=alternative_ids
+    ).aggregate(last=Max('updated_at'))
+    if request.user and request.user.is_authenticated:
+        viewer = f"u{request.user.pk}"
+    else:
+        viewer = f"h{request.META.get('HTTP_X_BUTTERUP_USER', '')}"
+    raw = "|".join(str(part) for part in (
+        *row, prices['last'], prices['count'], prices['total'],
+        ratings['last'], ratings['count'], snapshots['last'],
+        viewer, request.get_host(),
+    ))
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def _latest_prices(queryset):
+    """Narrow a Price queryset to the newest row per (product, store) pair in SQL.
+
+    Both branches order by (product, store, -recorded_at), matching price_psr_desc_idx.
+    """
+    if connection.features.can_distinct_on_fields:
+        return queryset.order_by('product_id', 'store_id', '-recorded_at').distinct('product_id', 'store_id')
+    # No DISTINCT ON (e.g. SQLite): rank each pair's rows with a window function instead
+    return queryset.annotate(
+        recency=Window(
+            RowNumber(),
+            partition_by=[F('product_id'), F('store_id')],
+            order_by=F('recorded_at').desc(),
+        )
+    ).filter(recency=1)
+
+
 # -----------------------------
 # NEW: ensure serializers see the request (for absolute URLs)
 # -----------------------------
@@ -276,15 +559,6 @@ class StoreViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
         # Log GPS store detection request
         logger.info(f"🏪 GPS Store Detection: lat={lat}, lng={lng}, radius={radius}km")
 
-        # Simple Haversine distance calculation
-        from math import radians, cos, sin, asin, sqrt
-        def haversine_distance(lat1, lng1, lat2, lng2):
-            R = 6371  # Earth's radius in kilometers
-            lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-            dlat = lat2 - lat1; dlng = lng2 - lng1
-            a = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlng/2)**2
-            return 2 * R * asin(sqrt(a))
-
         # Get base queryset
         queryset = self.get_queryset()
         
@@ -294,23 +568,19 @@ class StoreViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(chain__in=chain_list)
             logger.info(f"🔍 Filtering by chains: {chain_list}")
 
-        nearby_stores = []
-        total_stores_checked = 0
-        
-        for store in queryset:
-            total_stores_checked += 1
-            if store.latitude and store.longitude:
-                distance = haversine_distance(lat, lng, float(store.latitude), float(store.longitude))
-                if distance <= radius:
-                    store_data = self.get_serializer(store).data
-                    store_data['distance'] = round(distance, 2)
-                    nearby_stores.append(store_data)
-
-        # Sort by distance (closest first)
-        nearby_stores.sort(key=lambda x: x['distance'])
+        # Indexed bounding-box prefilter, then the exact Haversine radius check, both in SQL
+        matches = list(
+            queryset.filter(bounding_box_q(lat, lng, radius * 1000))
+            .annotate(distance_m=haversine_m_expression(lat, lng))
+            .filter(distance_m__lte=radius * 1000)
+            .order_by('distance_m')
+        )
+
+        # Closest first; serialize the matches, distance included, in one pass
+        nearby_stores = NearbyStoreSerializer(matches, many=True, context=self.get_serializer_context()).data
         
         # Log results for MVP tracking
-        logger.info(f"🎯 GPS Detection Results: Found {len(nearby_stores)} stores within {radius}km (checked {total_stores_checked} total stores)")
+        logger.info(f"🎯 GPS Detection Results: Found {len(nearby_stores)} stores within {radius}km")
         
         # Group by chain for easy mobile app consumption
         chains_summary = {}
@@ -346,8 +616,13 @@ class StoreViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'])
     def chains(self, request):
-        chains = Store.objects.filter(is_active=True).values_list('chain', flat=True).distinct()
-        return Response({'chains': list(chains)})
+        # Cleared by the Store save/delete signals
+        chains = cache.get_or_set(
+            STORE_CHAINS_CACHE_KEY,
+            lambda: list(Store.objects.filter(is_active=True).values_list('chain', flat=True).distinct()),
+            STORE_CHAINS_CACHE_TIMEOUT,
+        )
+        return Response({'chains': chains})
 
     @action(detail=False, methods=['get'], url_path='by-chain/(?P<chain>[^/.]+)')
     def by_chain(self, request, chain=None):
@@ -357,13 +632,14 @@ class StoreViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
         return Response({
             'chain': chain,
             'stores': serializer.data,
-            'total_count': stores.count()
+            'total_count': len(serializer.data)
         })
 
 
 class ProductViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
     """API endpoint for products"""
-    queryset = Product.objects.filter(is_active=True)
+    # ProductSerializer never reads these
+    queryset = Product.objects.filter(is_active=True).defer('image', 'versatility_tags', 'nutrition_profile')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -371,6 +647,28 @@ class ProductViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
     search_fields = ['name', 'brand']
     ordering_fields = ['name', 'brand', 'weight_grams']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        # The newest price overall is always one of the per-store latest rows, so
+        # ProductSerializer.get_latest_price can read it from this prefetch. "Latest"
+        # is a correlated NOT EXISTS rather than _latest_prices, so the prefetch's
+        # product_id IN (page) filter limits the work to this page's prices; each
+        # probe is a price_psr_desc_idx lookup ((store, product, recorded_at) is unique).
+        newer = Price.objects.filter(
+            product=OuterRef('product'), store=OuterRef('store'), recorded_at__gt=OuterRef('recorded_at'),
+        )
+        latest = (
+            Price.objects.filter(~Exists(newer))
+            .select_related('store')
+            .order_by('-recorded_at')
+        )
+        return queryset.prefetch_related(
+            Prefetch('prices', queryset=latest, to_attr='store_prices'),
+            'image_assets',
+        )
+
     @action(detail=False, methods=['get'], url_path='by-store/(?P<store_id>[^/.]+)')
     def by_store(self, request, store_id=None):
         """Get products available at a specific store with latest prices."""
@@ -379,18 +677,22 @@ class ProductViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
         except Store.DoesNotExist:
             return Response({'detail': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Get products that have prices at this store
-        products_with_prices = Product.objects.filter(
-            is_active=True,
-            prices__store=store
-        ).distinct().select_related().prefetch_related('prices')
+        # Get products that have prices at this store, prefetching only that store's prices
+        price_qs = Price.objects.filter(store=store).select_related('store').order_by('-recorded_at')
+        products_with_prices = list(
+            Product.objects.filter(is_active=True)
+            .filter(Exists(price_qs.filter(product=OuterRef('pk'))))
+            .prefetch_related(Prefetch('prices', queryset=price_qs, to_attr='store_prices'), 'image_assets')
+        )
 
         # If no products found for this specific store, fall back to chain
-        if not products_with_prices.exists():
-            products_with_prices = Product.objects.filter(
-                is_active=True,
-                prices__store__chain=store.chain
-            ).distinct().select_related().prefetch_related('prices')
+        if not products_with_prices:
+            price_qs = Price.objects.filter(store__chain=store.chain).select_related('store').order_by('-recorded_at')
+            products_with_prices = list(
+                Product.objects.filter(is_active=True)
+                .filter(Exists(price_qs.filter(product=OuterRef('pk'))))
+                .prefetch_related(Prefetch('prices', queryset=price_qs, to_attr='store_prices'), 'image_assets')
+            )
 
         serializer = self.get_serializer(products_with_prices, many=True)
         
@@ -402,7 +704,7 @@ class ProductViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
                 'city': store.city
             },
             'products': serializer.data,
-            'total_count': products_with_prices.count()
+            'total_count': len(serializer.data)
         })
 
     @action(detail=True, methods=['get'])
@@ -451,7 +753,12 @@ class ProductListView(ListAPIView):
     serializer_class = ProductListSerializer
 
     def get_queryset(self):
-        qs = Product.objects.filter(is_active=True).prefetch_related('image_assets', 'prices')
+        qs = (
+            Product.objects.filter(is_active=True)
+            .only('id', 'name', 'brand', 'slug', 'weight_grams', 'image')
+        )
+        # product_list_rows reads only the amount; it never touches price.store or image_assets
+        price_qs = Price.objects.only('id', 'product', 'price', 'recorded_at').order_by('-recorded_at')
 
         # optional text search
         q = self.request.query_params.get("q")
@@ -466,16 +773,29 @@ class ProductListView(ListAPIView):
         # IMPORTANT: only include products that have a price for this store if provided
         store_id = self.request.query_params.get("store") or self.request.query_params.get("store_id")
         if store_id:
-            qs = qs.filter(prices__store_id=store_id)
+            # semi-join: no row fan-out through prices, so no DISTINCT needed
+            qs = qs.filter(Exists(Price.objects.filter(product=OuterRef('pk'), store_id=store_id)))
+            price_qs = price_qs.filter(store_id=store_id)
+
+        # serializer reads the newest entry of this (store-scoped) price list
+        qs = qs.prefetch_related(Prefetch('prices', queryset=price_qs, to_attr='store_prices'))
 
-        # kill duplicates created by joining through prices
-        return qs.distinct().order_by("brand", "name")
+        return qs.order_by("brand", "name")
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["store_id"] = self.request.query_params.get("store") or self.request.query_params.get("store_id")
         return ctx
 
+    def list(self, request, *args, **kwargs):
+        # Rows are built as plain dicts; ProductListSerializer stays as the schema reference
+        queryset = self.filter_queryset(self.get_queryset())
+        store_id = self.get_serializer_context()["store_id"]
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(product_list_rows(page, request, store_id))
+        return Response(product_list_rows(queryset, request, store_id))
+
 
 
 
@@ -483,11 +803,11 @@ class QuickCompareView(APIView):
     """Quick compare table listing up to five butter brands across the main supermarkets"""
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    MAIN_CHAIN_LABELS = OrderedDict([
-        ("paknsave", "Pak'nSave"),
-        ("countdown", "Woolworths"),
-        ("new_world", "New World"),
-    ])
+    MAIN_CHAIN_LABELS = {
+        "paknsave": "Pak'nSave",
+        "countdown": "Woolworths",
+        "new_world": "New World",
+    }
 
     RAW_CHAIN_ALIASES = {
         "paknsave": "paknsave",
@@ -504,13 +824,15 @@ class QuickCompareView(APIView):
     }
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def _canonicalise(value: str) -> str:
         cleaned = value.replace("\u2019", "'").replace("_", " ")
         cleaned = " ".join(cleaned.strip().lower().split())
         return cleaned
 
-
+    # Only a handful of distinct chain strings exist, but this runs once per price row
     @classmethod
+    @lru_cache(maxsize=256)
     def normalise_chain(cls, chain_value):
         if not chain_value:
             return None
@@ -520,93 +842,136 @@ class QuickCompareView(APIView):
         compact = canonical.replace(" ", "")
         return cls.RAW_CHAIN_ALIASES.get(compact)
 
+    @classmethod
+    @lru_cache(maxsize=256)
+    def store_label(cls, chain_value):
+        """Map a raw Store.chain value straight to its column label (or None)."""
+        return cls.MAIN_CHAIN_LABELS.get(cls.normalise_chain(chain_value))
+
+    # Placeholder cells are never mutated (filled slots are replaced wholesale), so brands can share them
+    _EMPTY_STORE_MAP = {
+        label: {"store": label, "price": None, "recorded_at": None}
+        for label in MAIN_CHAIN_LABELS.values()
+    }
+
     @classmethod
     def empty_store_map(cls):
-        return OrderedDict(
-            (label, {"store": label, "price": None, "recorded_at": None})
-            for label in cls.MAIN_CHAIN_LABELS.values()
-        )
+        return cls._EMPTY_STORE_MAP.copy()
 
     def get(self, request):
-        prices = (
-            Price.objects
-            .select_related("product", "store")
-            .filter(product__is_active=True, store__is_active=True)
-            .order_by('-recorded_at')
+        # Payload embeds absolute image URLs, so key on the host as well as the price generation
+        origin = f"{request.scheme}://{request.get_host()}"
+        cache_key = f"quickcompare:v1:{price_generation()}:{origin}"
+        stale_key = f"quickcompare:v1:stale:{origin}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+        try:
+            payload = self.build_payload(request)
+        except DatabaseError:
+            # Serve the last good table rather than failing the home screen
+            stale = cache.get(stale_key)
+            if stale is None:
+                raise
+            logger.exception("QuickCompareView query failed; serving last cached table")
+            return Response(stale)
+
+        # payload is already JSON-ready (floats, ISO strings); QuickCompareBrandSerializer documents its shape
+        cache.set(cache_key, payload, QUICK_COMPARE_CACHE_TIMEOUT)
+        cache.set(stale_key, payload, QUICK_COMPARE_STALE_TIMEOUT)
+        return Response(payload)
+
+    def build_payload(self, request):
+        # Stores are few: resolve which ones belong to a main chain up front
+        store_labels = {}
+        for store_id, chain in Store.objects.filter(is_active=True).values_list('id', 'chain'):
+            label = self.store_label(chain)
+            if label:
+                store_labels[store_id] = label
+
+        # Same key as Product.brand_display_name, computed in SQL
+        latest = Price.objects.filter(pk__in=_latest_prices(
+            Price.objects.filter(product__is_active=True, store_id__in=list(store_labels))
+        ).values('pk')).annotate(
+            brand_key=Coalesce(NullIf(Trim('product__brand'), Value('')), Value('Unknown'))
         )
 
-        latest = {}
-        for price in prices:
-            key = (price.product_id, price.store_id)
-            if key not in latest:
-                latest[key] = price
+        # Top five brands by cheapest latest price, ranked in SQL
+        top_brands = [
+            entry['brand_key'] for entry in
+            latest.values('brand_key').annotate(cheapest=Min('price')).order_by('cheapest', 'brand_key')[:5]
+        ]
 
         brand_rows = {}
-        for price in latest.values():
-            normalised_chain = self.normalise_chain(price.store.chain)
-            if not normalised_chain:
-                continue
-
-            store_label = self.MAIN_CHAIN_LABELS.get(normalised_chain)
-            if not store_label:
-                continue
-
-            product = price.product
-            brand_display = (
-                getattr(product, 'brand_display_name', None)
-                or product.brand
-                or product.name
-                or 'Unknown'
-            )
-            brand_key = brand_display
+        # Plain dicts with the amount already a float: no model instances or Decimal per row
+        rows = (
+            latest.filter(brand_key__in=top_brands)
+            .annotate(price_f=Cast('price', FloatField()))
+            .values('price_f', 'recorded_at', 'store_id', 'brand_key', 'product__brand', 'product__image')
+        )
+        for price in rows.iterator(chunk_size=2000):
+            store_label = store_labels[price['store_id']]
+            brand_key = price['brand_key']
 
             if brand_key not in brand_rows:
+                # Unsaved stand-in so pick_image_url sees a real ImageField file
+                product = Product(brand=price['product__brand'], image=price['product__image'])
                 brand_rows[brand_key] = {
-                    'brand_name': product.brand or brand_display,
-                    'brand_display_name': brand_display,
+                    'brand_name': product.brand or brand_key,
+                    'brand_display_name': brand_key,
                     'image_url': pick_image_url(product, request),
                     'stores': self.empty_store_map(),
                 }
 
+            # pick_image_url always yields at least the brand fallback when given a request,
+            # so the URL built on insert is final. Several products of one brand at a store
+            # keep the cheapest, matching the SQL ranking.
             row = brand_rows[brand_key]
-            if not row['image_url']:
-                row['image_url'] = pick_image_url(product, request)
-
-            row['stores'][store_label] = {
-                'store': store_label,
-                'price': float(price.price) if price.price is not None else None,
-                'recorded_at': price.recorded_at,
-            }
+            amount = price['price_f']
+            current = row['stores'][store_label]['price']
+            if current is None or amount < current:
+                row['stores'][store_label] = {
+                    'store': store_label,
+                    'price': amount,
+                    'recorded_at': timezone.localtime(price['recorded_at']).isoformat(),
+                }
 
         payload = []
         for row in brand_rows.values():
             stores_list = list(row['stores'].values())
-            available_prices = [
-                entry['price'] for entry in stores_list if entry['price'] is not None
-            ]
-            if not available_prices:
-                continue
-
             payload.append({
                 'brand_name': row['brand_name'],
                 'brand_display_name': row['brand_display_name'],
                 'image_url': row['image_url'],
                 'stores': stores_list,
-                'cheapest_price': min(available_prices),
+                'cheapest_price': min(entry['price'] for entry in stores_list if entry['price'] is not None),
             })
 
         payload.sort(key=lambda item: item['cheapest_price'])
-        payload = payload[:5]
 
         if not payload:
-            logger.warning("QuickCompareView returned no rows (unique price entries=%s)", len(latest))
+            logger.warning("QuickCompareView returned no rows (main-chain stores=%s)", len(store_labels))
+
+        return payload
+
+
+class PriceCursorPagination(CursorPagination):
+    """Keyset pagination for the price history table: no OFFSET scans as it grows.
+
+    Opt-in with ?pagination=cursor; the default page-number pages keep count and ?page=N.
+    """
+    ordering = ('-recorded_at', '-id')
 
-        serializer = QuickCompareBrandSerializer(payload, many=True)
-        return Response(serializer.data)
 
 class PriceViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
     """API endpoint for prices"""
-    queryset = Price.objects.select_related('store', 'product').all()
+    # image_assets is prefetched so primary_image doesn't cost a query per row
+    queryset = (
+        Price.objects.select_related('store', 'product')
+        .prefetch_related('product__image_assets')
+        .defer(*PRICE_DEFERRED_FIELDS)
+    )
     serializer_class = PriceSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -614,17 +979,32 @@ class PriceViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
     search_fields = ['store__name', 'product__name', 'product__brand']
     ordering_fields = ['price', 'recorded_at', 'price_per_kg']
 
+    @property
+    def paginator(self):
+        # Cursor links carry ?pagination=cursor forward, so later pages stay keyset pages
+        if not hasattr(self, '_paginator') and self.request.query_params.get('pagination') == 'cursor':
+            self._paginator = PriceCursorPagination()
+        return super().paginator
+
     @action(detail=False, methods=['get'])
     def latest(self, request):
         """Get the most recent price per product-store pair."""
-        latest_prices = Price.objects.select_related('store', 'product').order_by('-recorded_at')
-        unique_prices, seen = [], set()
-        for p in latest_prices:
-            key = (p.product_id, p.store_id)
-            if key not in seen:
-                unique_prices.append(p); seen.add(key)
-        unique_prices.sort(key=lambda x: x.recorded_at, reverse=True)
-        return Response(self.get_serializer(unique_prices, many=True).data)
+        prices = Price.objects.all()
+        # ?store= / ?product= narrow the pairs before ranking rather than after
+        for field in ('store', 'product'):
+            value = request.query_params.get(field, '')
+            if value.isdigit():
+                prices = prices.filter(**{f'{field}_id': int(value)})
+        latest = _latest_prices(prices)
+        unique_prices = (
+            Price.objects.filter(pk__in=latest.values('pk'))
+            .select_related('store', 'product')
+            .prefetch_related('product__image_assets')
+            .defer(*PRICE_DEFERRED_FIELDS)
+            .order_by('-recorded_at')
+        )
+        # Unpaginated and table-sized: stream the rows so model instances don't pile up beside the output
+        return Response(self.get_serializer(unique_prices.iterator(chunk_size=2000), many=True).data)
 
     @action(detail=False, methods=['get'], url_path='by-store/(?P<store_id>[^/.]+)/latest')
     def by_store_latest(self, request, store_id=None):
@@ -634,15 +1014,21 @@ class PriceViewSet(RequestContextMixin, viewsets.ReadOnlyModelViewSet):
         except Store.DoesNotExist:
             return Response({'detail': 'Store not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        prices = (
-            Price.objects.filter(store=store, product__name__icontains='butter')
-            .select_related('store', 'product').order_by('-recorded_at')[:40]
+        # One query: this store's rows sort ahead of the rest of the chain
+        prices = list(
+            Price.objects.filter(store__chain=store.chain, product__is_butter=True)
+            .select_related('store', 'product')
+            .prefetch_related('product__image_assets')
+            .defer(*PRICE_DEFERRED_FIELDS)
+            .annotate(is_other_store=Case(
+                When(store_id=store.id, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ))
+            .order_by('is_other_store', '-recorded_at')[:40]
         )
-        if not prices:
-            prices = (
-                Price.objects.filter(store__chain=store.chain, product__name__icontains='butter')
-                .select_related('store', 'product').order_by('-recorded_at')[:40]
-            )
+        if prices and prices[0].store_id == store.id:
+            prices = [price for price in prices if price.store_id == store.id]
         return Response(self.get_serializer(prices, many=True).data)
 
     @action(detail=False, methods=['post'], url_path='scrape/by-store/(?P<store_id>[^/.]+)')
@@ -765,14 +1151,19 @@ class ScanSubmitAPIView(APIView):
             defaults={"name": "", "brand": "", "weight_grams": 0, "is_active": True},
         )
 
-        # 3) Nearest store (300 m radius default)
-        from .utils.geo import nearest_store
-        stores = Store.objects.filter(latitude__isnull=False, longitude__isnull=False)
-        store, distance_m = nearest_store(stores, latf, lngf, radius_m=300.0)
+        # 3) Nearest store (300 m radius default), found and fetched in one indexed query
+        store = (
+            Store.objects.filter(bounding_box_q(latf, lngf, 300.0))
+            .annotate(distance_m=haversine_m_expression(latf, lngf))
+            .filter(distance_m__lte=300.0)
+            .order_by("distance_m")
+            .first()
+        )
         if not store:
             return Response({"detail": "No nearby store found within 300m"}, status=400)
+        distance_m = store.distance_m
 
-        # 4) Save photo (optional)
+        # 4) Stage photo (optional); process_scan_upload stores it and activates the asset
         asset = None
         if upload:
             asset = ImageAsset.objects.create(
@@ -780,63 +1171,80 @@ class ScanSubmitAPIView(APIView):
                 store=store,
                 source="UPLOAD",
                 alt_text=f"{product.name or 'Unknown product'} at {store.name}",
+                is_active=False,
+                # Placeholder until the real checksum is computed, so pending assets
+                # don't collide on the (product, store, source, checksum) unique key
+                checksum=uuid.uuid4().hex,
             )
-            asset.file.save(upload.name, upload, save=True)
+            staged_path = default_storage.save(f"staging/scans/{asset.id}_{upload.name}", upload)
+            asset_id, upload_name = asset.id, upload.name
+            transaction.on_commit(lambda: process_scan_upload.delay(asset_id, staged_path, upload_name))
 
         # 5) Parse price (typed MVP)
         if not price_text:
             return Response({"detail": "price_text required for now"}, status=400)
-        try:
-            price_val = Decimal(price_text.replace("$", "").replace(",", ""))
-        except InvalidOperation:
+        match = PRICE_TEXT_RE.search(price_text)
+        if not match:
             return Response({"detail": "price_text invalid"}, status=400)
+        price_val = Decimal(match.group(0).replace(",", ""))
+
+        # 6) Record the contribution and upsert the latest Price together, so a failure
+        # can't leave one without the other. There is no (store, product) unique key to
+        # conflict on (history rows are keyed by recorded_at), so the upsert is an UPDATE
+        # of the newest row that falls back to INSERT when the store has none yet. Like
+        # the update_or_create it replaces, the update leaves recorded_at untouched.
+        price_per_kg = (price_val * 1000) / product.weight_grams if product.weight_grams else None
+        observed_cents = Price.cents_per_100g(price_val, product.weight_grams)
+        with transaction.atomic():
+            PriceContribution.objects.create(
+                user=request.user if request.user and request.user.is_authenticated else None,
+                product=product,
+                store=store,
+                price=price_val,
+                unit="each",
+                is_verified=False,
+            )
+            newest = Price.objects.filter(store=store, product=product).order_by("-recorded_at").values("pk")[:1]
+            updated = Price.objects.filter(pk=Subquery(newest)).update(
+                price=price_val,
+                price_per_kg=price_per_kg,
+                price_per_100g_cents=observed_cents,
+                is_on_special=False,
+                special_price=None,
+                special_end_date=None,
+            )
+            if updated:
+                # QuerySet.update() skips post_save, so bump the cache generation here
+                transaction.on_commit(lambda: bump_price_generation(sender=Price))
+            else:
+                Price.objects.create(store=store, product=product, price=price_val)
 
-        # 6) Create contribution (upserts Price via existing logic)
-        PriceContribution.objects.create(
-            user=request.user if request.user and request.user.is_authenticated else None,
-            product=product,
-            store=store,
-            price=price_val,
-            unit="each",
-            is_verified=False,
-        )
-
-        Price.objects.update_or_create(
-            store=store,
-            product=product,
-            defaults={
-                "price": price_val,
-                "price_per_kg": (
-                    (price_val * Decimal(1000)) / Decimal(product.weight_grams)
-                    if product.weight_grams
-                    else None
-                ),
-                "is_on_special": False,
-                "special_price": None,
-                "special_end_date": None,
-            },
-        )
+        # 7) Compute cheapest & nearby list (latest per store, deduped in SQL)
+        latest = Price.objects.filter(
+            pk__in=_latest_prices(Price.objects.filter(product=product)).values("pk")
+        ).select_related("store")
 
-        # 7) Compute cheapest & nearby list (latest per store)
-        latest_by_store = {}
-        prices = (
-            Price.objects.filter(product=product)
-            .select_related("store")
-            .order_by("store_id", "-recorded_at")
-        )
-        for price_obj in prices:
-            if price_obj.store_id not in latest_by_store:
-                latest_by_store[price_obj.store_id] = price_obj
+        # Cheapest anywhere: the database returns just that row
+        cheapest_price = latest.order_by("price").first()
 
+        # Nearby: only stores inside the 5 km box are loaded and measured
         nearby = []
-        from .utils.geo import haversine_m
-        for price_obj in latest_by_store.values():
+        located = list(latest.filter(bounding_box_q(latf, lngf, 5000.0, "store__latitude", "store__longitude")))
+        distances = haversine_m_many(
+            latf, lngf,
+            [price_obj.store.latitude for price_obj in located],
+            [price_obj.store.longitude for price_obj in located],
+        )
+        # Rank on integer cents (prices have two decimal places, so this is exact), then
+        # distance; only the ten kept are turned into dicts
+        rounded = np.round(distances, 1)
+        cents = np.fromiter((int(price_obj.price * 100) for price_obj in located), dtype=np.int64, count=len(located))
+        within = np.flatnonzero(distances <= 5000.0)
+        ranked = within[np.lexsort((rounded[within], cents[within]))[:10]].tolist()
+        rounded = rounded.tolist()
+        for i in ranked:
+            price_obj = located[i]
             store_obj = price_obj.store
-            if store_obj.latitude is None or store_obj.longitude is None:
-                continue
-            dist = haversine_m(latf, lngf, store_obj.latitude, store_obj.longitude)
-            if dist is None or dist > 5000.0:
-                continue
             nearby.append(
                 {
                     "store": {
@@ -845,15 +1253,12 @@ class ScanSubmitAPIView(APIView):
                         "name": store_obj.name,
                     },
                     "price": str(price_obj.price),
-                    "distance_m": round(dist, 1),
+                    "distance_m": rounded[i],
                 }
             )
-        nearby.sort(key=lambda entry: (Decimal(entry["price"]), entry["distance_m"]))
-        nearby = nearby[:10]
 
         cheapest = None
-        if latest_by_store:
-            cheapest_price = min(latest_by_store.values(), key=lambda obj: obj.price)
+        if cheapest_price:
             cheapest = {
                 "store": {
                     "id": cheapest_price.store.id,
@@ -881,18 +1286,7 @@ class ScanSubmitAPIView(APIView):
                     },
                     "distance_m": round(distance_m, 1),
                     "price": str(price_val),
-                    "unit_cents_per_100g": (
-                        int(
-                            round(
-                                (
-                                    (price_val * Decimal(100)) / Decimal(product.weight_grams)
-                                )
-                                * 100
-                            )
-                        )
-                        if product.weight_grams
-                        else None
-                    ),
+                    "unit_cents_per_100g": observed_cents,
                 },
                 "cheapest_overall": cheapest,
                 "nearby_options": nearby,
@@ -925,43 +1319,45 @@ class ListItemViewSet(RequestContextMixin, viewsets.ModelViewSet):
             return ListItemCreateSerializer
         return ListItemSerializer
 
-    def get_queryset(self):
-        # For MVP, use user=1 if no authenticated user
-        user = self.request.user if self.request.user.is_authenticated else None
-        if not user:
-            # Create or get a test user for MVP
-            from django.contrib.auth.models import User
-            user, created = User.objects.get_or_create(
-                username='test_user',
+    @staticmethod
+    def _default_user_id():
+        # Create or get a test user for MVP; the pk is shared through the cache
+        # (no expiry) and dropped by the user post_delete signal
+        user_id = cache.get(LIST_USER_CACHE_KEY)
+        if user_id is None:
+            user, created = get_user_model().objects.only('id').get_or_create(
+                username=LIST_USERNAME,
                 defaults={'email': 'test@example.com'}
             )
-        return ListItem.objects.filter(user=user).select_related('product', 'store')
+            user_id = user.pk
+            cache.set(LIST_USER_CACHE_KEY, user_id, None)
+        return user_id
+
+    def _list_user_id(self):
+        # For MVP, fall back to the shared test user if no authenticated user
+        if self.request.user.is_authenticated:
+            return self.request.user.pk
+        return self._default_user_id()
+
+    def get_queryset(self):
+        return ListItem.objects.filter(user_id=self._list_user_id()).select_related('product', 'store')
 
     def perform_create(self, serializer):
-        # For MVP, use user=1 if no authenticated user
-        user = self.request.user if self.request.user.is_authenticated else None
-        if not user:
-            from django.contrib.auth.models import User
-            user, created = User.objects.get_or_create(
-                username='test_user',
-                defaults={'email': 'test@example.com'}
-            )
-        
         # Get current price for the product at the store
         product = serializer.validated_data['product']
         store = serializer.validated_data['store']
         
-        # Get the latest price for this product at this store
+        # Newest price for this pair: a single-row range scan on price_psr_desc_idx
         latest_price = Price.objects.filter(
             product=product,
             store=store
-        ).order_by('-recorded_at').first()
+        ).order_by('-recorded_at').values_list('price', flat=True).first()
         
-        if not latest_price:
+        if latest_price is None:
             from rest_framework.exceptions import ValidationError
             raise ValidationError(f'No price found for {product.name} at {store.name}')
         
-        serializer.save(user=user, price_at_add=latest_price.price)
+        serializer.save(user_id=self._list_user_id(), price_at_add=latest_price)
     
     def create(self, request, *args, **kwargs):
         """Override create to return full object data"""
@@ -1000,87 +1396,67 @@ class CheapestView(APIView):
         
         try:
             # Parse store IDs
-            store_ids = [int(s.strip()) for s in stores_param.split(',') if s.strip()]
-            if not store_ids:
-                return Response(
-                    {'error': 'No valid store IDs provided'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Get stores
-            stores = Store.objects.filter(id__in=store_ids, is_active=True)
-            if not stores.exists():
-                return Response(
-                    {'error': 'No active stores found with provided IDs'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Get the cheapest butter product across all specified stores
-            # First, get all butter products with prices at these stores
-            butter_products = Product.objects.filter(
-                is_active=True,
-                name__icontains='butter',
-                prices__store__in=stores
-            ).distinct()
-            
-            if not butter_products.exists():
-                return Response(
-                    {'error': 'No butter products found at specified stores'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            cheapest_item = None
-            lowest_price = float('inf')
-            
-            # Find the cheapest product across all stores
-            for product in butter_products:
-                # Get latest price for this product at each store
-                latest_prices = Price.objects.filter(
-                    product=product,
-                    store__in=stores
-                ).select_related('store').order_by('-recorded_at')
-                
-                # Group by store to get latest price per store
-                store_prices = {}
-                for price in latest_prices:
-                    if price.store.id not in store_prices:
-                        store_prices[price.store.id] = price
-                
-                # Find the lowest price for this product
-                for store_id, price in store_prices.items():
-                    if price.price < lowest_price:
-                        lowest_price = price.price
-                        cheapest_item = {
-                            'brand': product.brand,
-                            'size': f"{product.weight_grams}g",
-                            'store': price.store.name,
-                            'price': float(price.price),
-                            'unit': float(price.price_per_kg) if price.price_per_kg else None,
-                            'product_id': product.id,
-                            'store_id': price.store.id,
-                            'product_name': product.name,
-                            'store_chain': price.store.chain
-                        }
-            
-            if not cheapest_item:
-                return Response(
-                    {'error': 'No prices found for butter products at specified stores'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            return Response(cheapest_item)
-            
+            store_ids = {int(s) for s in stores_param.split(',') if s.strip()}
         except ValueError:
             return Response(
                 {'error': 'Invalid store ID format. Please provide comma-separated integers.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            logger.error(f"Error in cheapest endpoint: {e}")
+        if not store_ids:
             return Response(
-                {'error': 'Internal server error'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'No valid store IDs provided'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        # Same store set in any order shares an entry; a new price bumps the generation
+        cache_key = f"cheapest:butter:v1:{price_generation()}:{','.join(map(str, sorted(store_ids)))}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            body, status_code = cached
+            return Response(body, status=status_code)
+        body, status_code = self._cheapest(store_ids)
+        cache.set(cache_key, (body, status_code), CHEAPEST_CACHE_TIMEOUT)
+        return Response(body, status=status_code)
+
+    def _cheapest(self, store_ids):
+        """Return (body, status) for the cheapest latest butter price at the given stores."""
+        # Cheapest of the latest price per (product, store) at the active stores, in a single query
+        latest = _latest_prices(Price.objects.filter(
+            product__is_active=True,
+            product__is_butter=True,
+            store_id__in=store_ids,
+            store__is_active=True,
+        ))
+        cheapest = (
+            Price.objects.filter(pk__in=latest.values('pk'))
+            .select_related('product', 'store')
+            .order_by('price')
+            .first()
+        )
+
+        # Only a miss needs to know whether the stores themselves exist
+        if not cheapest and not Store.objects.filter(id__in=store_ids, is_active=True).exists():
+            return {'error': 'No active stores found with provided IDs'}, status.HTTP_404_NOT_FOUND
+
+        cheapest_item = None
+        if cheapest:
+            product = cheapest.product
+            cheapest_item = {
+                'brand': product.brand,
+                'size': f"{product.weight_grams}g",
+                'store': cheapest.store.name,
+                'price': float(cheapest.price),
+                'unit': float(cheapest.price_per_kg) if cheapest.price_per_kg else None,
+                'product_id': product.id,
+                'store_id': cheapest.store.id,
+                'product_name': product.name,
+                'store_chain': cheapest.store.chain
+            }
+        
+        if not cheapest_item:
+            return {'error': 'No butter products found at specified stores'}, status.HTTP_404_NOT_FOUND
+        
+        return cheapest_item, status.HTTP_200_OK
 
 
 class UserProfileView(APIView):
@@ -1102,13 +1478,14 @@ class UserProfileView(APIView):
             'apple' if username.startswith('apple_') else 'email'
         )
 
-        serializer = UserProfileSerializer({
+        # All four values are already plain strings (the shape UserProfileSerializer
+        # documents), so skip building a serializer per request
+        return Response({
             'name': name,
             'email': email,
             'avatar_url': avatar_url,
             'provider': provider,
         })
-        return Response(serializer.data)
 
 
 class PriceContributionViewSet(RequestContextMixin, viewsets.ModelViewSet):
@@ -1129,39 +1506,43 @@ class PriceContributionViewSet(RequestContextMixin, viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         """Create a new price contribution and upsert the price"""
+        # Validation errors go through DRF's exception handler as regular 400s
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         try:
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            contribution = serializer.save()
-            
-            # Return the full contribution data
-            full_serializer = PriceContributionSerializer(contribution, context={'request': request})
-            headers = self.get_success_headers(full_serializer.data)
-            return Response(full_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-        except Exception as e:
+            with transaction.atomic():
+                contribution = serializer.save()
+        except DatabaseError as e:
+            # e.g. a concurrent Price upsert for the same (store, product, recorded_at)
             logger.error(f"Error creating price contribution: {e}")
             return Response(
                 {'error': 'Failed to create price contribution'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Return the full contribution data; product/store are already attached by
+        # the create serializer, so the nested name/chain fields cost no extra queries
+        full_serializer = PriceContributionSerializer(contribution, context={'request': request})
+        headers = self.get_success_headers(full_serializer.data)
+        return Response(full_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
 class ProductDetailAPIView(RequestContextMixin, APIView):
     """Retrieve full product detail payload including pricing and scores."""
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    def _get_product(self, identifier: str) -> Product:
-        queryset = _product_detail_queryset()
-        filters = Q(slug__iexact=identifier)
-        if str(identifier).isdigit():
-            filters |= Q(pk=int(identifier))
-        product = queryset.filter(filters).first()
-        if not product:
-            raise Http404("Product not found")
-        return product
+    def _get_product(self, identifier: str, user=None) -> Product:
+        return _get_detail_product(identifier, user)
 
+    @method_decorator(condition(etag_func=_product_detail_etag))
     def get(self, request, slug: str):
-        product = self._get_product(slug)
-        serializer = ProductDetailSerializer(product, context={'request': request})
+        context = {'request': request}
+        user = request.user if request.user and request.user.is_authenticated else None
+        if user:
+            # Rating prefetched with the product rather than queried by the serializer
+            context['current_user'] = user
+        product = self._get_product(slug, user)
+        serializer = ProductDetailSerializer(product, context=context)
         return Response(serializer.data)
 
 
@@ -1169,51 +1550,47 @@ class ProductRatingSubmitAPIView(RequestContextMixin, APIView):
     """Allow users (or demo guests) to submit ratings for a product."""
     permission_classes = [AllowAny]
 
-    def _get_product(self, slug: str) -> Product:
-        queryset = _product_detail_queryset()
-        filters = Q(slug__iexact=slug)
-        if str(slug).isdigit():
-            filters |= Q(pk=int(slug))
-        product = queryset.filter(filters).first()
-        if not product:
-            raise Http404('Product not found')
-        return product
+    def _get_product(self, slug: str, user=None) -> Product:
+        return _get_detail_product(slug, user)
 
     def _resolve_user(self, request, create_if_missing: bool = False):
         if request.user and request.user.is_authenticated:
             return request.user
-        username = None
-        headers = getattr(request, 'headers', {})
-        if headers:
-            username = headers.get('X-ButterUp-User') or headers.get('x-butterup-user')
+        # WSGI/ASGI already normalise header names; one plain dict lookup covers any casing
+        username = request.META.get('HTTP_X_BUTTERUP_USER')
         if not username and isinstance(getattr(request, 'data', None), dict):
             username = request.data.get('username')
         if not username:
             if not create_if_missing:
                 return None
-            username = 'butterup-guest'
+            username = GUEST_USERNAME
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(username=username)
-            return user
-        except UserModel.DoesNotExist:
-            if not create_if_missing:
-                return None
-        user, created = UserModel.objects.get_or_create(
-            username=username,
-            defaults={'email': f'{username}@example.com'}
-        )
-        if created:
-            user.set_unusable_password()
-            user.save(update_fields=['password'])
+        is_guest = username == GUEST_USERNAME
+        if is_guest:
+            # The shared guest is a singleton; a pk-only instance is enough for FKs and filters
+            guest_pk = cache.get(GUEST_USER_CACHE_KEY)
+            if guest_pk is not None:
+                return UserModel(pk=guest_pk, username=username)
+        # Only the pk is used downstream (FK assignment and rating filters)
+        users = UserModel.objects.only('id', 'username', 'password')
+        if not create_if_missing:
+            user = users.filter(username=username).first()
+        else:
+            user, created = users.get_or_create(
+                username=username,
+                defaults={'email': f'{username}@example.com', 'password': make_password(None)}
+            )
+        if is_guest and user is not None:
+            cache.set(GUEST_USER_CACHE_KEY, user.pk, 3600)
         return user
 
     def get(self, request, slug: str):
-        product = self._get_product(slug)
         user = self._resolve_user(request, create_if_missing=False)
+        # No detail serializer here, so skip the full product graph
+        product = _get_detail_product(slug, queryset=_product_rating_queryset(user))
         rating = None
         if user:
-            rating = product.user_ratings.filter(user=user).first()
+            rating = product.current_user_rating[0] if product.current_user_rating else None
         return Response({
             'user_rating': ProductUserRatingSerializer(rating).data if rating else None,
             'community_rating': product.get_user_rating_summary(),
@@ -1222,25 +1599,36 @@ class ProductRatingSubmitAPIView(RequestContextMixin, APIView):
         })
 
     def post(self, request, slug: str):
-        product = self._get_product(slug)
+        # Validate before loading the product graph, so a rejected submission costs no queries
         input_serializer = ProductRatingSubmissionSerializer(data=request.data)
         input_serializer.is_valid(raise_exception=True)
         payload = input_serializer.validated_data
+        # The one product fetch for this request; the response reuses it below
+        product = self._get_product(slug)
         user = self._resolve_user(request, create_if_missing=True)
 
-        rating, _ = ProductUserRating.objects.update_or_create(
-            product=product,
-            user=user,
-            defaults={
-                'overall_score': payload.get('overall_score'),
-                'cost_score': payload.get('cost_score'),
-                'texture_score': payload.get('texture_score'),
-                'recipe_score': payload.get('recipe_score'),
-                'comment': payload.get('comment') or '',
-            }
+        # Single INSERT ... ON CONFLICT DO UPDATE on (product, user). bulk_create skips
+        # save(), but the submission serializer already fills overall_score.
+        ProductUserRating.objects.bulk_create(
+            [ProductUserRating(
+                product=product,
+                user=user,
+                overall_score=payload.get('overall_score'),
+                cost_score=payload.get('cost_score'),
+                texture_score=payload.get('texture_score'),
+                recipe_score=payload.get('recipe_score'),
+                comment=payload.get('comment') or '',
+            )],
+            update_conflicts=True,
+            unique_fields=['product', 'user'],
+            update_fields=['overall_score', 'cost_score', 'texture_score', 'recipe_score', 'comment', 'updated_at'],
         )
+        # Read back the stored row: on conflict the id and created_at are the existing ones
+        rating = ProductUserRating.objects.get(product=product, user=user)
 
-        product = self._get_product(slug)
+        # Refresh only the rating-derived state rather than reloading the product graph
+        product.current_user_rating = [rating]
+        _refresh_rating_summary(product)
         detail_serializer = ProductDetailSerializer(
             product,
             context={'request': request, 'current_user': user}
@@ -1287,60 +1675,45 @@ class PricesByGTINView(APIView):
                 'detail': f'Product with GTIN {gtin} not found in our database'
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Get all stores
-        from .utils.geo import haversine_m
-        stores = list(Store.objects.all())
-        
-        # Calculate distances and find stores within radius
-        nearby_stores = []
-        for store in stores:
-            if store.latitude is not None and store.longitude is not None:
-                distance_m = haversine_m(lat, lng, store.latitude, store.longitude)
-                if distance_m <= radius_m:
-                    nearby_stores.append({
-                        'store': store,
-                        'distance_m': distance_m
-                    })
-        
-        # Sort by distance
-        nearby_stores.sort(key=lambda x: x['distance_m'])
-        
-        # Get latest prices for these stores
+        # Latest price per nearby store, joined to its store and ordered by distance,
+        # in a single query: indexed bounding box first, then the exact radius check
+        nearby_prices = (
+            Price.objects.filter(pk__in=_latest_prices(
+                Price.objects.filter(
+                    bounding_box_q(lat, lng, radius_m, 'store__latitude', 'store__longitude'),
+                    product=product,
+                )
+            ).values('pk'))
+            .select_related('store')
+            .annotate(distance_m=haversine_m_expression(lat, lng, 'store__latitude', 'store__longitude'))
+            .filter(distance_m__lte=radius_m)
+            .order_by('distance_m')
+        )
+
         nearby_options = []
         cheapest_overall = None
         cheapest_price = None
-        
-        for item in nearby_stores:
-            store = item['store']
-            distance_m = item['distance_m']
-            
-            # Get latest price for this product at this store
-            price_obj = Price.objects.filter(
-                product=product,
-                store=store
-            ).order_by('-recorded_at').first()
-            
-            if price_obj:
-                price_value = float(price_obj.price)
-                
-                nearby_options.append({
-                    'store': {
-                        'id': store.id,
-                        'chain': store.chain,
-                        'name': store.name,
-                        'address': store.address or '',
-                        'city': store.city or '',
-                    },
-                    'price': price_value,
-                    'distance_m': distance_m,
-                    'recorded_at': price_obj.recorded_at.isoformat() if price_obj.recorded_at else None,
-                })
-                
-                # Track cheapest
-                if cheapest_price is None or price_value < cheapest_price:
-                    cheapest_price = price_value
-                    cheapest_overall = nearby_options[-1]
-        
+
+        for price_obj in nearby_prices:
+            store = price_obj.store
+            nearby_options.append({
+                'store': {
+                    'id': store.id,
+                    'chain': store.chain,
+                    'name': store.name,
+                    'address': store.address or '',
+                    'city': store.city or '',
+                },
+                'price': float(price_obj.price),
+                'distance_m': price_obj.distance_m,
+                'recorded_at': price_obj.recorded_at.isoformat() if price_obj.recorded_at else None,
+            })
+
+            # Track cheapest on the exact Decimal; float is only for the response
+            if cheapest_price is None or price_obj.price < cheapest_price:
+                cheapest_price = price_obj.price
+                cheapest_overall = nearby_options[-1]
+
         return Response({
             'product': {
                 'id': product.id,
@@ -3,11 +3,14 @@ Django settings for butter_tracker project.
 """
 
 import os
+from itertools import chain
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from .env; deployments that inject the environment
+# directly can set DJANGO_SKIP_DOTENV=1 to skip reading the file
+if os.environ.get('DJANGO_SKIP_DOTENV') != '1':
+    load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,10 +27,10 @@ env_hosts = os.getenv("ALLOWED_HOSTS", default_hosts)
 
 # Always include our IP address for mobile app access
 required_hosts = ["10.0.2.2", "192.168.1.6"]  # Android emulator IPs
-all_hosts = env_hosts.split(",") + required_hosts
-ALLOWED_HOSTS = list(set([host.strip() for host in all_hosts if host.strip()]))  # Remove duplicates and whitespace
-
-print(f"DEBUG: ALLOWED_HOSTS = {ALLOWED_HOSTS}")  # Debug print
+# Strip whitespace and drop blanks/duplicates, keeping the configured order
+ALLOWED_HOSTS = list(dict.fromkeys(
+    host.strip() for host in chain(env_hosts.split(","), required_hosts) if host.strip()
+))
 
 
 # Application definition
@@ -86,6 +89,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Reuse connections across requests instead of reconnecting each time
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        # Required when running behind pgbouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False').lower() == 'true',
     }
 }
 
@@ -143,6 +151,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -162,6 +174,8 @@ REST_FRAMEWORK = {
         'anon': '60/min',
         'off_anon': '30/min',
         'off_user': '60/min',
+        'auth': '10/min',
+        'register': '5/hour',
     },
 }
 
@@ -214,6 +228,26 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Cache
+# Cached payloads are invalidated by bumping counters and deleting keys from signal
+# handlers (api.signals), which only reaches other web/Celery processes through a
+# shared cache, so Redis is used whenever REDIS_URL is configured. The per-process
+# LocMemCache fallback is for single-process development only.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'butterup',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -221,6 +255,11 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+
+# Photo identification is queued to a worker only when a real broker is configured;
+# otherwise (and in eager mode) it runs inline and answers 200 like it always did
+PHOTO_IDENTIFY_ASYNC = bool(os.getenv('REDIS_URL')) and not CELERY_TASK_ALWAYS_EAGER
 
 # Celery Beat Schedule
 from celery.schedules import crontab
@@ -250,6 +289,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'tasks.scraping_tasks.generate_weekly_report',
         'schedule': crontab(day_of_week=1, hour=10, minute=0),  # Every Monday at 10 AM
     },
+    'refresh-sign-in-jwks': {
+        'task': 'api.tasks.refresh_sign_in_jwks',
+        'schedule': crontab(minute='*/30'),  # Twice per JWKS_CACHE_TIMEOUT
+    },
 }
 
 # Email settings
@@ -262,6 +305,9 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@butterup.nz')
 
 # Logging
+# Healthy production requests log nothing; DEBUG keeps the INFO detail
+LOG_LEVEL = 'INFO' if DEBUG else 'WARNING'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -270,18 +316,21 @@ LOGGING = {
             'class': 'logging.StreamHandler',
         },
         'file': {
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.RotatingFileHandler',
             'filename': 'debug.log',
+            'maxBytes': 10 * 1024 * 1024,  # 10 MB
+            'backupCount': 3,
+            'delay': True,  # don't open the file until something is logged
         },
     },
     'root': {
         'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
             'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
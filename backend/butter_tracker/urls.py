@@ -6,7 +6,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from photo_compare.views import IdentifyByPhoto, ComparePrices, SuggestProducts
+from photo_compare.views import IdentifyByPhoto, IdentifyByPhotoResult, ComparePrices, SuggestProducts
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('api/', include('pricing.urls')),
     path('api/photo/identify', IdentifyByPhoto.as_view(), name='photo-identify'),
+    path('api/photo/identify/<str:task_id>', IdentifyByPhotoResult.as_view(), name='photo-identify-result'),
     path('api/compare', ComparePrices.as_view(), name='photo-compare'),
     path('api/products/suggest', SuggestProducts.as_view(), name='photo-suggest'),
 ]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from django.db import models
+from django.utils.functional import cached_property
 
 
 class Product(models.Model):
@@ -14,19 +15,31 @@ class Product(models.Model):
         ordering = ['brand', 'name']
 
     def __str__(self) -> str:
-        display = self.name
-        if self.brand:
-            display = f'{self.brand} {display}'
-        if self.size_g:
-            display = f'{display} ({self.size_g}g)'
-        return display
+        return self.display
+
+    @cached_property
+    def display(self) -> str:
+        return self.display_for(self.name, self.brand, self.size_g)
 
     def aliases(self) -> list[str]:
-        aliases = [self.name]
-        if self.brand:
-            aliases.append(f'{self.brand} {self.name}')
-        if self.alt_names:
-            aliases.extend([alt.strip() for alt in self.alt_names.split(',') if alt.strip()])
+        return self.aliases_for(self.name, self.brand, self.alt_names)
+
+    @staticmethod
+    def display_for(name: str, brand: str, size_g: int | None) -> str:
+        display = name
+        if brand:
+            display = f'{brand} {display}'
+        if size_g:
+            display = f'{display} ({size_g}g)'
+        return display
+
+    @staticmethod
+    def aliases_for(name: str, brand: str, alt_names: str) -> list[str]:
+        aliases = [name]
+        if brand:
+            aliases.append(f'{brand} {name}')
+        if alt_names:
+            aliases.extend([alt.strip() for alt in alt_names.split(',') if alt.strip()])
         return aliases
 
 
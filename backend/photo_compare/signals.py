@@ -0,0 +1,14 @@
+"""
+Signal handlers that keep the cached product match list in step with the catalog.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product
+from .utils.ocr import _build_choices
+
+
+@receiver([post_save, post_delete], sender=Product)
+def forget_product_choices(sender, **kwargs):
+    _build_choices.cache_clear()
@@ -0,0 +1,40 @@
+"""
+Celery tasks for photo_compare.
+"""
+
+import logging
+from typing import Any, Dict
+
+from celery import shared_task
+from django.core.files.storage import default_storage
+
+from .utils.ocr import guess_product, resize_image
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, queue='images')
+def ocr_identify(self, staged_path: str) -> Dict[str, Any]:
+    """
+    Resize a staged product photo, OCR it and guess the product.
+
+    When PHOTO_IDENTIFY_ASYNC is set, IdentifyByPhoto stages the upload and
+    returns the task id straight away, so the Pillow and Tesseract work runs on a
+    worker rather than the request thread; clients fetch this result from
+    IdentifyByPhotoResult. Without a broker the view runs the same steps inline.
+
+    Args:
+        staged_path: Storage path the upload was staged to
+
+    Returns:
+        guess_product() dict for the photo
+    """
+    try:
+        with default_storage.open(staged_path, 'rb') as fh:
+            data = fh.read()
+        return guess_product(resize_image(data))
+    except Exception as e:
+        logger.error(f"Error identifying photo {staged_path}: {e}")
+        raise
+    finally:
+        default_storage.delete(staged_path)
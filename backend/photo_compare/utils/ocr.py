@@ -1,73 +1,140 @@
 from __future__ import annotations
 
+import threading
+import unicodedata
+from functools import lru_cache
 from io import BytesIO
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Sequence
 
-import pytesseract
-from PIL import Image
-from rapidfuzz import fuzz, process
+import numpy as np
+from django.db.models import Count, Max
 
 from photo_compare.models import Product
 
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Pillow, Tesseract and rapidfuzz are imported on first use, so processes that only
+# load the URLconf (admin, pricing, beat) don't pay for them
+
 MAX_LONG_SIDE = 1280
+# Below this many aliases rank_aliases scores on a single thread
+PARALLEL_MIN_ALIASES = 20_000
+
+_tess = threading.local()
 
 
-def resize_image_bytes(image_bytes: bytes) -> bytes:
+def resize_image(image_bytes: bytes) -> Image.Image:
+    from PIL import Image
+
+    # Decoded once and handed to Tesseract as-is; no JPEG round trip in between
     with Image.open(BytesIO(image_bytes)) as image:
         image = image.convert('RGB')
-        width, height = image.size
-        if max(width, height) > MAX_LONG_SIDE:
-            if width >= height:
-                new_width = MAX_LONG_SIDE
-                new_height = int(MAX_LONG_SIDE / width * height)
-            else:
-                new_height = MAX_LONG_SIDE
-                new_width = int(MAX_LONG_SIDE / height * width)
-            image = image.resize((new_width, new_height))
-        buffer = BytesIO()
-        image.save(buffer, format='JPEG', optimize=True, quality=85)
-        return buffer.getvalue()
-
-
-def extract_lines(image_bytes: bytes) -> List[str]:
-    resized = resize_image_bytes(image_bytes)
-    with Image.open(BytesIO(resized)) as image:
-        try:
-            text = pytesseract.image_to_string(image)
-        except Exception:
-            text = ''
-    seen = set()
-    lines: List[str] = []
-    for line in text.splitlines():
-        cleaned = line.strip()
-        if cleaned:
-            key = cleaned.lower()
-            if key not in seen:
-                seen.add(key)
-                lines.append(cleaned)
-    return lines
-
-
-def _choices() -> tuple[List[tuple[str, int]], Dict[int, str]]:
-    choices: List[tuple[str, int]] = []
+    width, height = image.size
+    if max(width, height) > MAX_LONG_SIDE:
+        if width >= height:
+            new_width = MAX_LONG_SIDE
+            new_height = int(MAX_LONG_SIDE / width * height)
+        else:
+            new_height = MAX_LONG_SIDE
+            new_width = int(MAX_LONG_SIDE / height * width)
+        image = image.resize((new_width, new_height))
+    return image
+
+
+@lru_cache(maxsize=1)
+def _tesserocr():
+    # Cached so a missing tesserocr is only looked for once; failed imports aren't
+    # remembered in sys.modules
+    try:
+        import tesserocr
+    except ImportError:  # tesserocr is optional; extract_lines falls back to the pytesseract CLI wrapper
+        return None
+    return tesserocr
+
+
+def _image_to_string(image: Image.Image) -> str:
+    tesserocr = _tesserocr()
+    if tesserocr is None:
+        import pytesseract
+
+        return pytesseract.image_to_string(image)
+    # One in-process Tesseract per thread keeps the trained data loaded between calls,
+    # instead of a tesseract subprocess per image
+    api = getattr(_tess, 'api', None)
+    if api is None:
+        api = _tess.api = tesserocr.PyTessBaseAPI(lang='eng')
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+
+def extract_lines(image: Image.Image) -> List[str]:
+    try:
+        text = _image_to_string(image)
+    except Exception:
+        text = ''
+    # First spelling of each line wins; repeats differing only in case are dropped
+    lines: Dict[str, str] = {}
+    for cleaned in filter(None, map(str.strip, text.splitlines())):
+        lines.setdefault(cleaned.casefold(), cleaned)
+    return list(lines.values())
+
+
+@lru_cache(maxsize=1)
+def _build_choices(version: tuple) -> tuple[tuple[str, ...], tuple[int, ...], Dict[int, str]]:
+    aliases: List[str] = []
+    product_ids: List[int] = []
     lookup: Dict[int, str] = {}
-    for product in Product.objects.all():
-        lookup[product.id] = str(product)
-        for alias in product.aliases():
-            alias_clean = alias.strip()
+    # Plain tuples rather than model instances; the display/alias rules live on Product
+    rows = Product.objects.values_list('id', 'name', 'brand', 'size_g', 'alt_names')
+    for product_id, name, brand, size_g, alt_names in rows:
+        lookup[product_id] = Product.display_for(name, brand, size_g)
+        for alias in Product.aliases_for(name, brand, alt_names):
+            alias_clean = fold_text(alias)
             if alias_clean:
-                choices.append((alias_clean.lower(), product.id))
-    return choices, lookup
+                aliases.append(alias_clean)
+                product_ids.append(product_id)
+    return tuple(aliases), tuple(product_ids), lookup
+
+
+def product_choices() -> tuple[tuple[str, ...], tuple[int, ...], Dict[int, str]]:
+    # Rebuilt only when the catalog changes: saves and deletes in this process clear
+    # the cache (photo_compare.signals), and the id max/count version catches rows
+    # added or removed by other processes
+    version = Product.objects.aggregate(max_id=Max('id'), count=Count('id'))
+    return _build_choices((version['max_id'], version['count']))
+
+
+def fold_text(text: str) -> str:
+    # Lowercase, strip accents and collapse whitespace, so OCR noise like "Président"
+    # or doubled spaces still matches; the result is pure ASCII, which rapidfuzz
+    # reads without converting
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(folded.lower().split())
+
 
+def rank_aliases(query: str, aliases: Sequence[str], limit: int) -> List[tuple[int, float]]:
+    # One batched partial_ratio pass over every alias (aliases are folded at build
+    # time, so no processor); returns (alias index, score) pairs, best first
+    from rapidfuzz import fuzz, process
 
-def guess_product(image_bytes: bytes) -> Dict[str, object]:
+    # Threads only pay off for very large catalogs; a few hundred aliases score
+    # faster on the calling thread than it takes to start a pool
+    workers = -1 if len(aliases) >= PARALLEL_MIN_ALIASES else 1
+    scores = process.cdist([fold_text(query)], aliases, scorer=fuzz.partial_ratio, processor=None,
+                           dtype=np.float32, workers=workers)[0]
+    top = np.argsort(-scores, kind='stable')[:limit]
+    return [(int(index), float(scores[index])) for index in top]
+
+
+def guess_product(image: Image.Image) -> Dict[str, object]:
     try:
-        lines = extract_lines(image_bytes)
+        lines = extract_lines(image)
     except Exception:
         lines = []
 
-    haystack = ' '.join(lines).lower()
-    choices, lookup = _choices()
+    haystack = fold_text(' '.join(lines))
+    aliases, product_ids, lookup = product_choices()
 
     result: Dict[str, object] = {
         'score': 0.0,
@@ -76,7 +143,7 @@ def guess_product(image_bytes: bytes) -> Dict[str, object]:
         'lines': lines,
     }
 
-    if not haystack or not choices:
+    if not haystack or not aliases:
         suggestions = [
             {'product_id': pid, 'name': name}
             for pid, name in list(lookup.items())[:3]
@@ -85,36 +152,24 @@ def guess_product(image_bytes: bytes) -> Dict[str, object]:
             result['suggestions'] = suggestions
         return result
 
+    matches: List[tuple[int, float]] = []
     try:
-        best = process.extractOne(
-            haystack,
-            choices,
-            scorer=fuzz.partial_ratio,
-        )
-    except Exception:
-        best = None
-
-    matches: List[tuple[str, float, int]] = []
-    try:
-        matches = process.extract(
-            haystack,
-            choices,
-            scorer=fuzz.partial_ratio,
-            limit=10,
-        )
+        matches = rank_aliases(haystack, aliases, limit=10)
     except Exception:
         pass
+    best = matches[0] if matches else None
 
     suggestions: List[Dict[str, object]] = []
     seen_products: set[int] = set()
-    for alias, score, product_id in matches:
+    for index, score in matches:
+        product_id = product_ids[index]
         if product_id in seen_products:
             continue
         seen_products.add(product_id)
         suggestions.append({
             'product_id': product_id,
-            'name': lookup.get(product_id, alias),
-            'score': float(score),
+            'name': lookup.get(product_id, aliases[index]),
+            'score': score,
         })
         if len(suggestions) >= 3:
             break
@@ -125,7 +180,8 @@ def guess_product(image_bytes: bytes) -> Dict[str, object]:
         ]
 
     if best:
-        _, score, product_id = best
+        index, score = best
+        product_id = product_ids[index]
         result['score'] = float(score)
         if product_id in lookup:
             result['product_id'] = product_id if score >= 0 else None
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import uuid
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
-from haversine import haversine
-from rapidfuzz import fuzz, process
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+import numpy as np
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
@@ -13,7 +17,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.generics import GenericAPIView
 
-from photo_compare.models import Price, Product, Store
+from photo_compare.models import Price, Product
 from photo_compare.serializers import (
     CandidateSerializer,
     CompareResponseSerializer,
@@ -21,11 +25,16 @@ from photo_compare.serializers import (
     SuggestionSerializer,
     PhotoInputSerializer,
 )
-from photo_compare.utils.ocr import resize_image_bytes, guess_product
+from photo_compare.tasks import ocr_identify
+from photo_compare.utils.ocr import guess_product, product_choices, rank_aliases, resize_image
 
 ALLOWED_CONTENT_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
 MAX_UPLOAD_SIZE = 3 * 1024 * 1024  # 3 MB
 SCORE_THRESHOLD = 70.0
+EARTH_RADIUS_KM = 6371.0088  # mean radius, as used by the haversine package
+IDENTIFY_TASK_CACHE_PREFIX = 'photo-identify:'
+IDENTIFY_TASK_TIMEOUT = 60 * 60  # how long a queued identify task can be polled
+GUESS_KEYS = {'score', 'product_id', 'product_name', 'lines'}
 
 
 def json_error(message: str, status_code: int = status.HTTP_400_BAD_REQUEST) -> Response:
@@ -36,17 +45,21 @@ def build_price_rows(product: Product, lat: float, lng: float) -> tuple[List[Dic
     prices = list(
         Price.objects.select_related('store')
         .filter(product=product)
+        .only('price', 'currency', 'updated_at',
+              'store__id', 'store__name', 'store__chain', 'store__lat', 'store__lng')
     )
 
     if not prices:
         return [], None, None
 
-    entries: List[tuple[float, Price]] = []
-    for price in prices:
-        store: Store = price.store
-        distance = haversine((lat, lng), (store.lat, store.lng))
-        entries.append((distance, price))
+    # Great-circle distances to every store in one vectorised pass
+    lat_rad, lng_rad = np.radians(lat), np.radians(lng)
+    lats = np.radians(np.fromiter((price.store.lat for price in prices), dtype=np.float64, count=len(prices)))
+    lngs = np.radians(np.fromiter((price.store.lng for price in prices), dtype=np.float64, count=len(prices)))
+    a = np.sin(0.5 * (lats - lat_rad)) ** 2 + np.cos(lat_rad) * np.cos(lats) * np.sin(0.5 * (lngs - lng_rad)) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
+    entries: List[tuple[float, Price]] = list(zip(distances.tolist(), prices))
     entries.sort(key=lambda item: (float(item[1].price), item[0]))
     cheapest_price = float(entries[0][1].price)
     max_savings = 0.0
@@ -71,6 +84,29 @@ def build_price_rows(product: Product, lat: float, lng: float) -> tuple[List[Dic
     return rows, cheapest_price, (max_savings if max_savings > 0 else None)
 
 
+def candidate_response(guess: Dict[str, Any]) -> Response:
+    payload: Dict[str, Any] = {
+        'score': float(guess.get('score') or 0.0),
+        'product_id': guess.get('product_id'),
+        'product_name': guess.get('product_name'),
+        'lines': guess.get('lines', []),
+    }
+
+    suggestions = guess.get('suggestions') or []
+    if suggestions:
+        payload['suggestions'] = [
+            {'product_id': item['product_id'], 'name': item['name']}
+            for item in suggestions
+        ]
+
+    serializer = CandidateSerializer(payload)
+
+    if payload['product_id'] is None or payload['score'] < SCORE_THRESHOLD:
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class IdentifyByPhoto(GenericAPIView):
     parser_classes = [MultiPartParser]
     throttle_classes = [AnonRateThrottle]
@@ -94,32 +130,44 @@ class IdentifyByPhoto(GenericAPIView):
         if not data:
             return json_error('Empty image.')
 
+        if not settings.PHOTO_IDENTIFY_ASYNC:
+            # No worker to hand off to: resize + OCR in the request, as before
+            try:
+                return candidate_response(guess_product(resize_image(data)))
+            except Exception:
+                return json_error('Failed to process image.', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Resize + OCR run on a Celery worker; the client polls IdentifyByPhotoResult
+        staged_path = default_storage.save(f'staging/photos/{uuid.uuid4().hex}', ContentFile(data))
         try:
-            resized = resize_image_bytes(data)
-            guess = guess_product(resized)
+            result = ocr_identify.delay(staged_path)
         except Exception:
-            return json_error('Failed to process image.', status.HTTP_500_INTERNAL_SERVER_ERROR)
+            default_storage.delete(staged_path)
+            return json_error('Image processing is unavailable.', status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        payload: Dict[str, Any] = {
-            'score': float(guess.get('score') or 0.0),
-            'product_id': guess.get('product_id'),
-            'product_name': guess.get('product_name'),
-            'lines': guess.get('lines', []),
-        }
+        # Remember the id so the result endpoint only serves identify tasks it issued
+        cache.set(f'{IDENTIFY_TASK_CACHE_PREFIX}{result.id}', True, IDENTIFY_TASK_TIMEOUT)
+        return Response({'task_id': result.id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
 
-        suggestions = guess.get('suggestions') or []
-        if suggestions:
-            payload['suggestions'] = [
-                {'product_id': item['product_id'], 'name': item['name']}
-                for item in suggestions
-            ]
 
-        serializer = CandidateSerializer(payload)
+class IdentifyByPhotoResult(APIView):
+    throttle_classes = [AnonRateThrottle]
+    permission_classes = [AllowAny]
 
-        if payload['product_id'] is None or payload['score'] < SCORE_THRESHOLD:
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    def get(self, request, task_id: str, *args, **kwargs) -> Response:
+        if not cache.get(f'{IDENTIFY_TASK_CACHE_PREFIX}{task_id}'):
+            return json_error('Unknown or expired task.', status.HTTP_404_NOT_FOUND)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        result = ocr_identify.AsyncResult(task_id)
+        if not result.ready():
+            return Response({'task_id': task_id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+        if not result.successful():
+            return json_error('Failed to process image.', status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        guess = result.result
+        if not isinstance(guess, dict) or not GUESS_KEYS <= guess.keys():
+            return json_error('Unknown or expired task.', status.HTTP_404_NOT_FOUND)
+        return candidate_response(guess)
 
 
 class ComparePrices(APIView):
@@ -139,7 +187,7 @@ class ComparePrices(APIView):
             return json_error('lat and lng must be valid floats.')
 
         try:
-            product = Product.objects.get(id=product_id)
+            product = Product.objects.only('id', 'name', 'brand', 'size_g').get(id=product_id)
         except Product.DoesNotExist:
             return json_error('Product not found.', status.HTTP_404_NOT_FOUND)
 
@@ -148,7 +196,7 @@ class ComparePrices(APIView):
         serializer = CompareResponseSerializer({
             'product': {
                 'id': product.id,
-                'name': str(product),
+                'name': product.display,
             },
             'prices': PriceRowSerializer(rows, many=True).data,
             'summary': {
@@ -168,36 +216,24 @@ class SuggestProducts(APIView):
         if not query:
             return Response([], status=status.HTTP_200_OK)
 
-        choices: List[tuple[str, int]] = []
-        lookup: Dict[int, str] = {}
+        aliases, product_ids, lookup = product_choices()
 
-        for product in Product.objects.all():
-            lookup[product.id] = str(product)
-            for alias in product.aliases():
-                alias_clean = alias.strip()
-                if alias_clean:
-                    choices.append((alias_clean.lower(), product.id))
-
-        if not choices:
+        if not aliases:
             return Response([], status=status.HTTP_200_OK)
 
-        matches = process.extract(
-            query.lower(),
-            choices,
-            scorer=fuzz.partial_ratio,
-            limit=20,
-        )
+        matches = rank_aliases(query, aliases, limit=20)
 
         seen: set[int] = set()
         suggestions: List[Dict[str, Any]] = []
-        for _, score, product_id in matches:
+        for index, score in matches:
+            product_id = product_ids[index]
             if product_id in seen:
                 continue
             seen.add(product_id)
             suggestions.append({
                 'product_id': product_id,
                 'name': lookup.get(product_id, ''),
-                'score': float(score),
+                'score': score,
             })
             if len(suggestions) >= 5:
                 break
@@ -25,8 +25,9 @@ def grouped_prices(request):
     store_names = [name.strip() for name in stores_param.split(',')]
     
     # Get stores by name
-    stores = Store.objects.filter(name__in=store_names)
-    if not stores.exists():
+    # Evaluated once here; the emptiness check and the loop below share the result
+    stores = list(Store.objects.filter(name__in=store_names))
+    if not stores:
         return Response({'error': 'No valid stores found'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Get the latest prices for each product-store combination